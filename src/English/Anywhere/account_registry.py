@@ -0,0 +1,71 @@
+# accounts.txt as a frozenset that follows edits to the file without a restart.
+import os
+import signal
+import threading
+import time
+from typing import FrozenSet, Optional, Tuple
+
+
+class AccountRegistry:
+    """Set of account names from a one-name-per-line file.
+
+    The file is stat'ed at most once per `check_interval` seconds and re-read only when its
+    inode, size or mtime changed; `request_reload()` (wired to SIGHUP by `install_reload_signal`)
+    forces the next lookup to re-read it. Each reload builds a new frozenset and swaps it in with
+    a single assignment, so a lookup sees either the old set or the new one, never a partial one.
+    If the file cannot be read, the last good set stays in place.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._names: FrozenSet[str] = frozenset()
+        self._stat_key: Optional[Tuple[int, int, int]] = None
+        self._checked_at = float("-inf")
+        self._reload_requested = False
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.current()
+
+    def __len__(self) -> int:
+        return len(self.current())
+
+    def request_reload(self) -> None:
+        # Only sets a flag, so it is safe to call from a signal handler.
+        self._reload_requested = True
+
+    def install_reload_signal(self, signum: Optional[int] = getattr(signal, "SIGHUP", None)) -> bool:
+        """Re-read the file when the process receives `signum` (SIGHUP by default, where it exists)."""
+        if signum is None:
+            return False
+        signal.signal(signum, lambda *_: self.request_reload())
+        return True
+
+    def current(self) -> FrozenSet[str]:
+        now = time.monotonic()
+        if self._reload_requested or now - self._checked_at >= self.check_interval:
+            self._refresh(now)
+        return self._names
+
+    def _refresh(self, now: float) -> None:
+        with self._lock:
+            force = self._reload_requested
+            self._reload_requested = False
+            self._checked_at = now
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._names, self._stat_key = frozenset(), None
+                return
+            except OSError:
+                return
+            stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if not force and stat_key == self._stat_key:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as acc_file:
+                    names = frozenset(line.strip() for line in acc_file if line.strip())
+            except (OSError, UnicodeDecodeError):
+                return
+            self._names, self._stat_key = names, stat_key
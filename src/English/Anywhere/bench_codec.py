@@ -0,0 +1,232 @@
+# Codec benchmark and round-trip regression check; run before and after touching codec.py and compare the JSON files.
+#
+#   python bench_codec.py --out before.json
+#   python bench_codec.py --out after.json --compare before.json
+import argparse
+import hashlib
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import codec
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BASES = (16, 60, 1200)
+# Character pools per mix; sizes are measured in UTF-8 bytes of the input text.
+MIXES = {
+    "ascii": "".join(chr(c) for c in range(32, 127)),
+    "bmp": "aé中ßЖש€ー한́￿",
+    "astral": "😀𝄞🂡𐍈🦄",
+}
+# Single-message payloads still decode superlinearly (about 0.12 s for 10k ASCII characters and 7 s
+# for 100k at L=60), and /decode accepts them as attachments of that size, so 100k stays covered.
+# The 1M case would take minutes per run.
+LEGACY_MAX_SIZE = 100_000
+
+
+def _text_of_size(mix: str, size: int, rng: random.Random) -> str:
+    pool = MIXES[mix]
+    chars: List[str] = []
+    total = 0
+    while total < size:
+        ch = rng.choice(pool)
+        chars.append(ch)
+        total += len(ch.encode("utf-8"))
+    return "".join(chars)
+
+
+def _password_for(base_l: int) -> str:
+    # L is the sum of len("U+XXXX") over the password, i.e. 6 per BMP character, floored at 16.
+    return "pw" if base_l == 16 else "a" * (base_l // 6)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _measure(fn: Callable[[], object], min_time: float, max_runs: int) -> List[float]:
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < 3 or (time.perf_counter() - started < min_time and len(samples) < max_runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if samples[-1] > min_time:
+            break  # one run of a huge case is already a stable number
+    return samples
+
+
+def _summary(samples: List[float], size: int) -> Dict:
+    median = statistics.median(samples)
+    return {
+        "runs": len(samples),
+        "mean_s": statistics.fmean(samples),
+        "p50_s": median,
+        "p90_s": _percentile(samples, 90),
+        "p99_s": _percentile(samples, 99),
+        "mb_per_s": size / median / 1e6 if median else None,
+    }
+
+
+def run_benchmarks(sizes, bases, mixes, min_time: float, max_runs: int, seed: int) -> List[Dict]:
+    cases: List[Dict] = []
+    for mix in mixes:
+        for size in sizes:
+            text = _text_of_size(mix, size, random.Random(f"{seed}-{mix}-{size}"))
+            for base_l in bases:
+                blocks = codec.encode_blocks(text, base_l)
+                encoded_len = sum(map(len, blocks))
+                rows = [
+                    ("blocks", "encode", lambda: codec.encode_blocks(text, base_l)),
+                    ("blocks", "decode", lambda: codec.decode_blocks(blocks, base_l)),
+                ]
+                if size <= LEGACY_MAX_SIZE and mix != "astral":
+                    # Astral text does not round-trip in the single-message format; only the block format carries it.
+                    password = _password_for(base_l)
+                    payload, legacy_l = codec.encode_text_to_payload(text, password)
+                    rows += [
+                        ("legacy", "encode", lambda: codec.encode_text_to_payload(text, password)),
+                        ("legacy", "decode", lambda: codec.decode_payload(payload, legacy_l)),
+                    ]
+                for fmt, op, fn in rows:
+                    case = {"format": fmt, "op": op, "mix": mix, "size": size, "L": base_l}
+                    case.update(_summary(_measure(fn, min_time, max_runs), size))
+                    if fmt == "blocks":
+                        case["encoded_chars"] = encoded_len
+                        case["blocks"] = len(blocks)
+                    cases.append(case)
+                    print(
+                        f"{fmt:6} {op:6} {mix:6} {size:>9} B  L={base_l:<5} "
+                        f"p50 {case['p50_s'] * 1e3:10.3f} ms  p99 {case['p99_s'] * 1e3:10.3f} ms  "
+                        f"{case['mb_per_s'] or 0:8.3f} MB/s"
+                    )
+    return cases
+
+
+def _corpus(seed: int) -> List[str]:
+    # Edge cases for each fragile step (leading zero digits, the shift transform on tiny payloads,
+    # codepoints near the % 0x110000 wrap, combining marks) plus seeded random texts.
+    rng = random.Random(seed)
+    corpus = [
+        "a", "0", "\x00", "\x00\x00a", "ab", "￿", "Ā", "ÿĀ",
+        "é́", "line\nbreak\ttab", " ", "😀", "a😀b", "𝄞" * 3, "\U0010ffff",
+    ]
+    for mix in MIXES:
+        for length in (1, 2, 3, 7, 31, 32, 33, 255, 256, 1000):
+            corpus.append("".join(rng.choice(MIXES[mix]) for _ in range(length)))
+    return corpus
+
+
+def check_round_trips(seed: int) -> Dict:
+    failures: List[Dict] = []
+    fingerprint = hashlib.sha256()
+    corpus = _corpus(seed)
+    checked = 0
+    for text in corpus:
+        for password in (None, "pw", "a much longer password"):
+            base_l = codec.base_l_for(text, password)
+            for block_chars in (None, 1, 3):
+                checked += 1
+                blocks = codec.encode_blocks(text, base_l, block_chars)
+                # Stream ids are random per encoding, so only the rest of each token is fingerprinted.
+                fingerprint.update("\n".join(block.split(".", 2)[2] for block in blocks).encode("ascii"))
+                try:
+                    decoded = codec.decode_blocks(list(reversed(blocks)), base_l)
+                except ValueError as e:
+                    decoded = f"<error: {e}>"
+                if decoded != text:
+                    failures.append({"format": "blocks", "text": text, "password": password, "got": decoded})
+
+            if any(ord(ch) > 0xFFFF for ch in text):
+                continue
+            checked += 1
+            payload, legacy_l = codec.encode_text_to_payload(text, password)
+            fingerprint.update(payload.encode("ascii"))
+            try:
+                decoded = codec.decode_payload(payload, legacy_l)
+            except ValueError as e:
+                decoded = f"<error: {e}>"
+            if decoded != text:
+                failures.append({"format": "legacy", "text": text, "password": password, "got": decoded})
+
+    # The fingerprint changes whenever the encoded output does, which is a wire format break.
+    return {"checked": checked, "failures": failures, "output_sha256": fingerprint.hexdigest()}
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict, baseline_path: str) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def key(case):
+        return case["format"], case["op"], case["mix"], case["size"], case["L"]
+
+    old = {key(c): c for c in baseline.get("cases", [])}
+    print(f"\nChange in p50 against {baseline_path} (revision {baseline.get('revision')}):")
+    for case in results["cases"]:
+        before = old.get(key(case))
+        if before and before["p50_s"]:
+            ratio = case["p50_s"] / before["p50_s"]
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"  {' '.join(map(str, key(case))):40} x{ratio:6.2f}{flag}")
+    old_sha = baseline.get("correctness", {}).get("output_sha256")
+    if old_sha and old_sha != results["correctness"]["output_sha256"]:
+        print("  Encoded output differs from the baseline; the wire format changed.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark and round-trip check for the /encode codec.")
+    parser.add_argument("--out", default="codec_bench.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="input sizes in UTF-8 bytes")
+    parser.add_argument("--bases", type=int, nargs="+", default=list(BASES), help="L values to run")
+    parser.add_argument("--mixes", nargs="+", default=list(MIXES), choices=list(MIXES))
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to keep repeating each case")
+    parser.add_argument("--max-runs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-bench", action="store_true", help="only run the round-trip corpus")
+    args = parser.parse_args(argv)
+
+    correctness = check_round_trips(args.seed)
+    print(f"Round trips: {correctness['checked']} checked, {len(correctness['failures'])} failed")
+    for failure in correctness["failures"][:10]:
+        print(f"  {failure['format']}: {failure['text']!r} (password {failure['password']!r}) -> {failure['got']!r}")
+
+    cases = [] if args.skip_bench else run_benchmarks(
+        args.sizes, args.bases, args.mixes, args.min_time, args.max_runs, args.seed
+    )
+    results = {
+        "revision": _revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": args.seed,
+        "correctness": correctness,
+        "cases": cases,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 1 if correctness["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+# Custom text codec behind /encode and /decode; kept free of bot state so worker processes can import it.
+import base64
+import hashlib
+import math
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from radix import digits_to_int, int_to_digits
+
+# Byte translation tables between hex characters and their digit values.
+_HEX_DIGITS = b"0123456789ABCDEF"
+_HEX_TO_VALUE = bytes.maketrans(_HEX_DIGITS, bytes(range(16)))
+_VALUE_TO_HEX = bytes.maketrans(bytes(range(16)), _HEX_DIGITS)
+
+
+def compute_base_l_from_string(source: str) -> int:
+    # Derive base L from any string by summing the lengths of Unicode identifiers for every character.
+    if not source:
+        raise ValueError("Base L source string is empty.")
+    total = 0
+    for ch in source:
+        cp = ord(ch)
+        ident = f"U+{cp:04X}"
+        total += len(ident)
+    return total
+
+
+def base_l_for(text: str, base_source: Optional[str]) -> int:
+    # L comes from the password when one is given, otherwise from the text itself; never below 16.
+    if base_source is not None and base_source != "":
+        l_source = base_source
+    else:
+        l_source = text
+    return max(compute_base_l_from_string(l_source), 16)
+
+
+def encode_text_to_payload(text: str, base_source: Optional[str]) -> (str, int):
+    # Encode text per the custom spec: derive L, convert to hex digits, treat as base-L integer, transform, and base64 wrap.
+    L = base_l_for(text, base_source)
+    return _encode_with_base(text, L), L
+
+
+def _encode_with_base(text: str, L: int) -> str:
+    hex_parts: List[str] = []
+    for ch in text:
+        cp = ord(ch)
+        ident = f"U+{cp:04X}"
+        hex_part = ident[2:]
+        hex_parts.append(hex_part)
+
+    # Concatenate all per-character hex segments to form a long digit string.
+    hex_concat = "".join(hex_parts)
+    hex_length = len(hex_concat)
+
+    # Interpret that string as a number in base L; every hex digit must be < L.
+    if L == 16:
+        # Power-of-two base: CPython parses this in linear time.
+        value = int(hex_concat, 16) if hex_concat else 0
+    else:
+        digits = hex_concat.encode("ascii").translate(_HEX_TO_VALUE)
+        if digits and max(digits) >= L:
+            raise ValueError("Base L is too small for the provided text/password combination.")
+        value = digits_to_int(digits, L)
+
+    # Convert the base-L number to raw bytes, tracking exact lengths for lossless decode.
+    if value == 0:
+        value_bytes = b"\x00"
+    else:
+        byte_len = (value.bit_length() + 7) // 8
+        value_bytes = value.to_bytes(byte_len, "big")
+
+    payload_bytes = hex_length.to_bytes(4, "big")
+    payload_bytes += len(value_bytes).to_bytes(4, "big")
+    payload_bytes += value_bytes
+
+    # Record hex and lengths, then perform the mandated first-char shift transform.
+    codepoints = list(payload_bytes)
+    second_hex_parts: List[str] = []
+    lengths: List[int] = []
+    for cp in codepoints:
+        hex2 = f"{cp:02X}"
+        second_hex_parts.append(hex2)
+        lengths.append(len(hex2))
+
+    if second_hex_parts:
+        first_hex = second_hex_parts[0]
+        if not first_hex:
+            raise ValueError("First hex segment is unexpectedly empty.")
+        first_char = first_hex[0]
+        second_hex_parts[0] = first_hex[1:]
+        second_hex_parts[-1] = second_hex_parts[-1] + first_char
+        lengths[0] -= 1
+        lengths[-1] += 1
+
+    transformed_concat = "".join(second_hex_parts)
+
+    # Split back according to recorded lengths and map each group to a Unicode codepoint.
+    final_groups: List[str] = []
+    cursor = 0
+    for length in lengths:
+        if length <= 0:
+            raise ValueError("Invalid recorded length during encoding.")
+        next_cursor = cursor + length
+        final_groups.append(transformed_concat[cursor:next_cursor])
+        cursor = next_cursor
+
+    if cursor != len(transformed_concat):
+        raise ValueError("Length tracking mismatch during encoding.")
+
+    encoded_chars = "".join(chr(int(group, 16) % 0x110000) for group in final_groups)
+    return base64.b64encode(encoded_chars.encode("utf-8")).decode("ascii")
+
+
+def _transformed_hex_lengths(count: int) -> List[int]:
+    # Reconstruct expected group lengths after the transform: first shortens, last lengthens.
+    if count <= 0:
+        return []
+    if count == 1:
+        return [2]
+    lengths = [2] * count
+    lengths[0] = 1
+    lengths[-1] = 3
+    return lengths
+
+
+def decode_payload(encoded: str, base_l: int, allow_truncated: bool = True) -> str:
+    # Reverse the encoding pipeline using only the encoded string and base L.
+    if base_l <= 15:
+        raise ValueError("Base L must be greater than 15.")
+
+    if not encoded:
+        return ""
+
+    try:
+        encoded_bytes = base64.b64decode(encoded, validate=True)
+        encoded_chars = encoded_bytes.decode("utf-8")
+    except Exception:
+        encoded_chars = encoded  # legacy path without base64
+
+    raw_hex_per_char: List[str] = []
+    for ch in encoded_chars:
+        raw_hex_per_char.append(f"U+{ord(ch):04X}"[2:])
+
+    lengths = _transformed_hex_lengths(len(encoded_chars))
+    if len(lengths) != len(raw_hex_per_char):
+        raise ValueError("Length bookkeeping mismatch during decode.")
+
+    transformed_groups: List[str] = []
+    for raw_hex, needed_len in zip(raw_hex_per_char, lengths):
+        if needed_len <= 0 or needed_len > len(raw_hex):
+            raise ValueError("Encoded data is malformed (invalid group length).")
+        transformed_groups.append(raw_hex[-needed_len:])
+
+    if transformed_groups:
+        if len(transformed_groups) == 1:
+            raise ValueError("Encoded data is malformed (truncated payload).")
+        if not transformed_groups[-1]:
+            raise ValueError("Encoded data is malformed (empty last group).")
+        moved_char = transformed_groups[-1][-1]
+        transformed_groups[-1] = transformed_groups[-1][:-1]
+        if not transformed_groups[-1] or not transformed_groups[0]:
+            raise ValueError("Encoded data is malformed (empty group after reversal).")
+        transformed_groups[0] = moved_char + transformed_groups[0]
+
+    byte_values = [int(group, 16) for group in transformed_groups]
+    payload_bytes = bytes(byte_values)
+
+    if len(payload_bytes) < 8:
+        raise ValueError("Encoded payload is too short.")
+
+    hex_length = int.from_bytes(payload_bytes[:4], "big")
+    value_len = int.from_bytes(payload_bytes[4:8], "big")
+
+    value_bytes = payload_bytes[8:8 + value_len]
+    payload_incomplete = len(value_bytes) < value_len
+    if payload_incomplete and not allow_truncated:
+        raise ValueError("Encoded payload is truncated.")
+    if payload_incomplete:
+        # If Discord dropped bytes, fall back to whatever survived and still try to decode.
+        value_bytes = payload_bytes[8:]
+
+    if not value_bytes:
+        raise ValueError("Encoded payload missing integer data.")
+
+    value = int.from_bytes(value_bytes, "big")
+
+    # Convert base-L integer back to hex digits string.
+    if value == 0:
+        digits_str = ""
+    elif base_l == 16:
+        digits_str = format(value, "X")
+    else:
+        digits = int_to_digits(value, base_l)
+        if max(digits) >= 16:
+            raise ValueError("Encoded payload is corrupted (digit out of hex range).")
+        digits_str = bytes(digits).translate(_VALUE_TO_HEX).decode("ascii")
+
+    min_hex_length = ((len(digits_str) + 3) // 4) * 4 if digits_str else 0
+
+    if payload_incomplete:
+        hex_length = min_hex_length
+    elif min_hex_length and hex_length < min_hex_length:
+        raise ValueError(
+            f"Specified hex length ({hex_length}) is shorter than required minimum ({min_hex_length})."
+        )
+
+    if hex_length == 0:
+        hex_concat = ""
+    else:
+        hex_concat = digits_str.rjust(hex_length, "0")
+
+    if hex_concat and len(hex_concat) % 4 != 0:
+        raise ValueError("Recovered hex length is not multiple of 4.")
+
+    chars: List[str] = []
+    for i in range(0, len(hex_concat), 4):
+        if i + 4 > len(hex_concat):
+            raise ValueError("Recovered hex data is misaligned.")
+        cp = int(hex_concat[i:i + 4], 16)
+        cp %= 0x110000
+        chars.append(chr(cp))
+
+    return "".join(chars)
+
+
+# Chunked container, version 1. The text is cut into fixed-size blocks that are encoded
+# separately with the stream's shared L, and each block becomes one whitespace-free token:
+#
+#     PBC1.<stream id>.<seq>.<count>.<payload>
+#
+# <payload> is a regular single-message payload. Tokens can be spread over several messages or
+# an attachment and are put back in order by seq. Characters outside the BMP are carried as
+# UTF-16 surrogate pairs, so every unit is exactly four hex digits and block boundaries never
+# disturb the digit alignment. Lone surrogates in the input are not valid UTF-16, so they do not
+# round-trip: decoding such a stream raises UnicodeDecodeError (a ValueError).
+#
+# <stream id> only has to tell streams apart when tokens from several encodings are pasted
+# together. It is salted with L and random bytes, so encoding the same text twice, or under
+# different passwords, gives different ids.
+CHUNK_MAGIC = "PBC1"
+# Longest token a block may produce; leaves room for the L line and a mention in a 2000-char message.
+BLOCK_TOKEN_BUDGET = 1800
+
+_HEADER_BUDGET = len(CHUNK_MAGIC) + 1 + 6 + 1 + 7 + 1 + 7 + 1
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def _to_utf16_units(text: str) -> str:
+    def pair(match) -> str:
+        cp = ord(match.group()) - 0x10000
+        return chr(0xD800 + (cp >> 10)) + chr(0xDC00 + (cp & 0x3FF))
+
+    return _ASTRAL.sub(pair, text)
+
+
+def _from_utf16_units(units: str) -> str:
+    return units.encode("utf-16-be", "surrogatepass").decode("utf-16-be")
+
+
+def block_chars_for(base_l: int, token_budget: int = BLOCK_TOKEN_BUDGET) -> int:
+    """Largest block (in UTF-16 units) whose token is guaranteed to fit in `token_budget` chars."""
+    # A block of n units is 4n base-L digits, so at most ceil(4n*log2(L)/8) value bytes. Each
+    # payload byte becomes one char of at most two UTF-8 bytes (three for the last one) behind an
+    # 8-byte length header, and base64 then grows that by a third.
+    utf8_budget = (token_budget - _HEADER_BUDGET - 4) * 3 // 4
+    value_bytes = (utf8_budget - 1) // 2 - 8
+    return max(1, int((value_bytes - 1) * 2 / math.log2(base_l)))
+
+
+def stream_id_for(text: str, base_l: int) -> str:
+    digest = hashlib.blake2b(digest_size=3, salt=os.urandom(hashlib.blake2b.SALT_SIZE))
+    digest.update(base_l.to_bytes(8, "big"))
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def iter_encoded_blocks(text: str, base_l: int, block_chars: Optional[int] = None) -> Iterator[str]:
+    """Yield the chunked tokens for `text` one block at a time; cost is linear in the text length."""
+    if base_l <= 15:
+        raise ValueError("Base L must be greater than 15.")
+    units = _to_utf16_units(text)
+    if block_chars is None:
+        block_chars = block_chars_for(base_l)
+    count = max(1, -(-len(units) // block_chars))
+    prefix = f"{CHUNK_MAGIC}.{stream_id_for(text, base_l)}."
+    for seq in range(count):
+        block = units[seq * block_chars:(seq + 1) * block_chars]
+        yield f"{prefix}{seq}.{count}.{_encode_with_base(block, base_l)}"
+
+
+def encode_blocks(text: str, base_l: int, block_chars: Optional[int] = None) -> List[str]:
+    # Materialised form of iter_encoded_blocks for callers that cannot take a generator (worker processes).
+    return list(iter_encoded_blocks(text, base_l, block_chars))
+
+
+def parse_block(token: str) -> Optional[Tuple[str, int, int, str]]:
+    """(stream id, seq, count, payload) for a chunk token, or None if it is not one."""
+    parts = token.split(".", 4)
+    if len(parts) != 5 or parts[0] != CHUNK_MAGIC:
+        return None
+    stream_id, seq, count, payload = parts[1:]
+    if not (seq.isdigit() and count.isdigit()):
+        return None
+    seq_i, count_i = int(seq), int(count)
+    if count_i <= 0 or seq_i >= count_i:
+        return None
+    return stream_id, seq_i, count_i, payload
+
+
+def find_blocks(text: str) -> List[str]:
+    # Tokens never contain whitespace, so pasted or concatenated message bodies split cleanly.
+    return [token for token in text.split() if token.startswith(CHUNK_MAGIC + ".")]
+
+
+def _collect_stream(tokens: Iterable[str]) -> Tuple[Optional[Tuple[str, int]], Dict[int, str]]:
+    # Blocks of the first stream seen, by seq; tokens of any other stream mixed into the same paste are ignored.
+    stream: Optional[Tuple[str, int]] = None
+    payloads: Dict[int, str] = {}
+    for token in tokens:
+        block = parse_block(token)
+        if block is None:
+            continue
+        stream_id, seq, count, payload = block
+        if stream is None:
+            stream = (stream_id, count)
+        elif stream != (stream_id, count):
+            continue
+        known = payloads.setdefault(seq, payload)
+        if known != payload:
+            raise ValueError(f"Block {seq + 1} appears twice with different contents.")
+    return stream, payloads
+
+
+def stream_status(tokens: Iterable[str]) -> Optional[Tuple[str, int, List[int]]]:
+    """(stream id, block count, missing seqs) of the first stream in `tokens`, or None if there is none."""
+    stream, payloads = _collect_stream(tokens)
+    if stream is None:
+        return None
+    return stream[0], stream[1], [seq for seq in range(stream[1]) if seq not in payloads]
+
+
+def decode_blocks(tokens: Iterable[str], base_l: int) -> str:
+    """Reassemble and decode one chunked stream; tokens may arrive in any order and repeat."""
+    stream, payloads = _collect_stream(tokens)
+    if stream is None:
+        raise ValueError("No encoded blocks found.")
+    count = stream[1]
+    missing = [seq for seq in range(count) if seq not in payloads]
+    if missing:
+        raise ValueError(f"Missing {len(missing)} of {count} blocks (first missing: block {missing[0] + 1}).")
+    units = "".join(decode_payload(payloads[seq], base_l, allow_truncated=False) for seq in range(count))
+    return _from_utf16_units(units)
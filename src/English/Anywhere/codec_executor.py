@@ -0,0 +1,140 @@
+# Runs the /encode and /decode codec off the event loop: tiny inputs inline, large ones in a bounded process pool.
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Set
+
+import codec
+from metrics import note_executor_wait
+
+
+def _mp_context():
+    # forkserver/spawn workers start from a clean interpreter instead of forking a process that
+    # is running the gateway connection and its threads.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class _Worker:
+    """One worker process, in a single-process pool so it can be killed without touching the others."""
+
+    def __init__(self, pool: ProcessPoolExecutor, pid: int):
+        self.pool = pool
+        self.pid = pid
+
+    def stop(self) -> None:
+        # Killed rather than left to finish, so repeated timeouts cannot pile up CPU-bound processes.
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            pass  # already gone
+
+
+class CodecExecutor:
+    """Bounded codec runner so one huge /encode cannot stall the gateway heartbeat.
+
+    Inputs up to `inline_limit` characters run inline, since a pool round trip would cost more
+    than the math. Anything bigger goes to one of `max_workers` worker processes, and at most
+    `max_pending` such jobs run or wait for a worker at once. Plain text over `max_input`
+    characters and encoded input over `max_encoded` are rejected outright. A job that runs longer
+    than `timeout` (time spent waiting for a worker does not count) fails with ValueError, and its
+    worker is terminated and replaced. Callers should defer the interaction before handing over
+    anything that will not run inline.
+    """
+
+    def __init__(
+        self,
+        inline_limit: int = 1024,
+        max_input: int = 200_000,
+        max_encoded: int = 2_000_000,
+        timeout: float = 30.0,
+        max_workers: int = 2,
+        max_pending: int = 8,
+    ):
+        self.inline_limit = inline_limit
+        self.max_input = max_input
+        self.max_encoded = max_encoded
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._slots = asyncio.Semaphore(max_pending)
+        self._free = asyncio.Semaphore(max_workers)
+        self._idle: List[_Worker] = []
+        self._workers: Set[_Worker] = set()
+
+    async def _checkout(self) -> _Worker:
+        await self._free.acquire()
+        try:
+            if self._idle:
+                return self._idle.pop()
+            # Workers start lazily; the pid lets a stuck one be terminated on its own.
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=_mp_context())
+            try:
+                pid = await asyncio.get_running_loop().run_in_executor(pool, os.getpid)
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            worker = _Worker(pool, pid)
+            self._workers.add(worker)
+            return worker
+        except BaseException:
+            self._free.release()
+            raise
+
+    def _checkin(self, worker: _Worker, healthy: bool) -> None:
+        if healthy and worker in self._workers:
+            self._idle.append(worker)
+        else:
+            self._workers.discard(worker)
+            worker.stop()
+        self._free.release()
+
+    def runs_inline(self, size: int) -> bool:
+        return size <= self.inline_limit
+
+    async def _run(self, size: int, limit: int, fn, *args):
+        if size > limit:
+            raise ValueError(f"Input is too long ({size} characters, limit is {limit}).")
+        if self.runs_inline(size):
+            return fn(*args)
+
+        submitted = time.monotonic()
+        async with self._slots:
+            worker = await self._checkout()
+            note_executor_wait(time.monotonic() - submitted)
+            healthy = False
+            try:
+                # The worker is idle, so the job starts now and the timeout covers only its run.
+                future = asyncio.get_running_loop().run_in_executor(worker.pool, fn, *args)
+                result = await asyncio.wait_for(future, self.timeout)
+                healthy = True
+                return result
+            except asyncio.TimeoutError:
+                raise ValueError(f"Took longer than {self.timeout:g} seconds.") from None
+            except BrokenProcessPool:
+                raise ValueError("Codec worker crashed.") from None
+            except Exception:
+                healthy = True  # the codec itself raised; the worker is fine
+                raise
+            finally:
+                self._checkin(worker, healthy)
+
+    async def encode_blocks(self, text: str, base_l: int) -> List[str]:
+        return await self._run(len(text), self.max_input, codec.encode_blocks, text, base_l)
+
+    async def decode(self, encoded: str, base_l: int) -> str:
+        # Single-message payloads from before the chunked format.
+        return await self._run(len(encoded), self.max_encoded, codec.decode_payload, encoded, base_l)
+
+    async def decode_blocks(self, tokens: List[str], base_l: int) -> str:
+        return await self._run(sum(map(len, tokens)), self.max_encoded, codec.decode_blocks, tokens, base_l)
+
+    def shutdown(self) -> None:
+        workers, self._workers = self._workers, set()
+        self._idle.clear()
+        for worker in workers:
+            worker.stop()
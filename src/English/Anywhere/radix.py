@@ -0,0 +1,70 @@
+# Divide-and-conquer radix conversion for the encode/decode codec.
+# Splitting on powers of the base keeps both directions at O(M(n) log n) instead of the quadratic digit-at-a-time loops.
+import math
+from typing import Dict, List, Sequence
+
+# Below this many digits plain Horner / divmod on small ints is faster than splitting further.
+_LEAF_DIGITS = 32
+
+
+class _Powers:
+    """base**exp memo; each recursion level only ever asks for one or two distinct exponents."""
+
+    def __init__(self, base: int):
+        self.base = base
+        self._cache: Dict[int, int] = {}
+
+    def __call__(self, exp: int) -> int:
+        value = self._cache.get(exp)
+        if value is None:
+            value = self._cache[exp] = self.base ** exp
+        return value
+
+
+def _digits_to_int(digits: Sequence[int], lo: int, hi: int, powers: _Powers) -> int:
+    if hi - lo <= _LEAF_DIGITS:
+        base = powers.base
+        value = 0
+        for i in range(lo, hi):
+            value = value * base + digits[i]
+        return value
+    mid = (lo + hi) // 2
+    high = _digits_to_int(digits, lo, mid, powers)
+    low = _digits_to_int(digits, mid, hi, powers)
+    return high * powers(hi - mid) + low
+
+
+def digits_to_int(digits: Sequence[int], base: int) -> int:
+    """Value of `digits` (most significant first) in `base`."""
+    if not digits:
+        return 0
+    return _digits_to_int(digits, 0, len(digits), _Powers(base))
+
+
+def _int_to_digits(value: int, count: int, powers: _Powers, out: List[int]) -> None:
+    # Appends exactly `count` digits (with leading zeros) for a value known to fit.
+    if count <= _LEAF_DIGITS:
+        base = powers.base
+        leaf = [0] * count
+        for i in range(count - 1, -1, -1):
+            value, leaf[i] = divmod(value, base)
+        out.extend(leaf)
+        return
+    low_count = count // 2
+    high, low = divmod(value, powers(low_count))
+    _int_to_digits(high, count - low_count, powers, out)
+    _int_to_digits(low, low_count, powers, out)
+
+
+def int_to_digits(value: int, base: int) -> List[int]:
+    """Digits of a non-negative `value` in `base`, most significant first, without leading zeros."""
+    if value < 0:
+        raise ValueError("value must be non-negative")
+    if value == 0:
+        return []
+    # Upper bound on the digit count; the surplus comes back as leading zeros and is trimmed.
+    count = int(value.bit_length() / math.log2(base)) + 2
+    out: List[int] = []
+    _int_to_digits(value, count, _Powers(base), out)
+    first = next(i for i, d in enumerate(out) if d)
+    return out[first:]
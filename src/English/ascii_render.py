@@ -0,0 +1,58 @@
+# Whole-frame ASCII renderer for /badapple: one lookup-table pass per frame instead of a per-pixel Python loop.
+# OpenCV and NumPy are imported on the first render, so constructing a renderer (or serving frames
+# from the pre-rendered cache) never loads them.
+
+
+class AsciiRenderer:
+    """Map BGR video frames to fixed-size ASCII art through a 256-entry byte lookup table."""
+
+    def __init__(self, width: int, height: int, charset: str):
+        if width <= 0 or height <= 0:
+            raise ValueError("Renderer size must be positive.")
+        if len(charset) < 2:
+            raise ValueError("Charset needs at least two characters.")
+        try:
+            charset_bytes = charset.encode("ascii")
+        except UnicodeEncodeError:
+            raise ValueError("Charset must be plain ASCII.") from None
+
+        self.width = width
+        self.height = height
+        self.charset = charset
+        self._charset_bytes = charset_bytes
+        self._lut = None
+        self._out = None
+
+    @property
+    def frame_size(self) -> int:
+        """Length in bytes of every rendered frame (rows plus the newlines between them)."""
+        return self.height * (self.width + 1) - 1
+
+    def _build_tables(self) -> None:
+        import numpy as np
+
+        # Same float arithmetic as the original per-pixel loop so every brightness lands on the same char.
+        scale = (len(self.charset) - 1) / 255
+        lut = np.frombuffer(bytes(self._charset_bytes[int(px * scale)] for px in range(256)), dtype=np.uint8)
+        # Output buffer is one extra column wide so the newlines come out of the same tobytes() call.
+        self._out = np.full((self.height, self.width + 1), ord("\n"), dtype=np.uint8)
+        # Assigned last: two decode threads may race here, and both build identical tables.
+        self._lut = lut
+
+    def render_bytes(self, frame) -> bytes:
+        import cv2
+
+        if self._lut is None:
+            self._build_tables()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray.size == 0:
+            return b""
+
+        resized = cv2.resize(gray, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        out = self._out.copy()
+        out[:, :self.width] = self._lut[resized]
+        # Drop the trailing newline so the text matches "\n".join(rows).
+        return out.tobytes()[:-1]
+
+    def render(self, frame) -> str:
+        return self.render_bytes(frame).decode("ascii")
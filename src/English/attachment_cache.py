@@ -0,0 +1,159 @@
+# Upload-once cache for images: remember the CDN URL of each file's first upload and reuse it for repeat sends.
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import discord
+
+from metrics import to_thread
+
+# Unsigned URLs (no `ex` parameter) are treated as good for this long after upload.
+_DEFAULT_TTL = 20 * 3600
+
+
+def _url_expiry(url: str, uploaded_at: float) -> float:
+    # Discord signs attachment URLs with ex=<hex unix time> after which the CDN refuses them.
+    ex = parse_qs(urlparse(url).query).get("ex")
+    if ex:
+        try:
+            return float(int(ex[0], 16))
+        except ValueError:
+            pass
+    return uploaded_at + _DEFAULT_TTL
+
+
+class AttachmentCache:
+    """Persistent map from file content hash to the attachment URL it was first uploaded as."""
+
+    def __init__(self, path: str, refresh_margin: float = 3600, verify_interval: float = 3600):
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.verify_interval = verify_interval
+        self._lock = threading.Lock()
+        # file path -> (size, mtime_ns, sha256) so unchanged files are not rehashed on every pick.
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        # sha256 -> {"url", "expires", "verified_at"}
+        self._urls: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._hashes = {k: tuple(v) for k, v in data.get("hashes", {}).items()}
+        self._urls = data.get("urls", {})
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"hashes": self._hashes, "urls": self._urls}, f)
+        os.replace(tmp_path, self.path)
+
+    def _digest(self, file_path: str) -> str:
+        st = os.stat(file_path)
+        known = self._hashes.get(file_path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self._hashes[file_path] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def lookup(self, file_path: str) -> Tuple[Optional[str], bool]:
+        """Return (url, needs_verify) for a still-valid upload of this file's content, else (None, False)."""
+        with self._lock:
+            entry = self._urls.get(self._digest(file_path))
+            if entry is None:
+                return None, False
+            now = time.time()
+            if entry["expires"] - now < self.refresh_margin:
+                return None, False
+            return entry["url"], now - entry.get("verified_at", 0) > self.verify_interval
+
+    def remember(self, file_path: str, url: str) -> None:
+        with self._lock:
+            now = time.time()
+            self._urls[self._digest(file_path)] = {
+                "url": url,
+                "expires": _url_expiry(url, now),
+                "verified_at": now,
+            }
+            self._save()
+
+    def mark_verified(self, url: str) -> None:
+        with self._lock:
+            for entry in self._urls.values():
+                if entry["url"] == url:
+                    entry["verified_at"] = time.time()
+            self._save()
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._urls = {k: v for k, v in self._urls.items() if v["url"] != url}
+            self._save()
+
+
+async def url_is_live(url: str, timeout: float = 1.0) -> bool:
+    """HEAD the CDN URL; a deleted source message or revoked signature shows up as a 4xx."""
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            async with session.head(url, allow_redirects=True) as resp:
+                return resp.status < 400
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        # Unknown rather than dead; the expiry check still bounds how long a URL is reused.
+        return True
+
+
+async def uploaded_url(interaction: discord.Interaction, callback_response) -> Optional[str]:
+    """URL of the first attachment on the message an interaction reply created."""
+    # discord.py 2.5+ hands back the created message; older versions need a fetch.
+    message = getattr(callback_response, "resource", None)
+    if not getattr(message, "attachments", None):
+        try:
+            message = await interaction.original_response()
+        except discord.HTTPException:
+            return None
+    attachments = getattr(message, "attachments", None)
+    return attachments[0].url if attachments else None
+
+
+async def respond_with_image(outbound, interaction: discord.Interaction, cache: AttachmentCache, file_path: str):
+    """Reply with an image, reusing an earlier upload of the same bytes when its URL is still good."""
+    url, needs_verify = await to_thread(cache.lookup, file_path)
+    deferred = False
+    if url and needs_verify:
+        # The HEAD check can take up to its timeout; acknowledge first so it never eats the reply window.
+        await outbound.defer(interaction, thinking=True)
+        deferred = True
+        if await url_is_live(url):
+            await to_thread(cache.mark_verified, url)
+        else:
+            await to_thread(cache.forget, url)
+            url = None
+    send = outbound.followup if deferred else outbound.respond
+    if url:
+        embed = discord.Embed()
+        embed.set_image(url=url)
+        return await send(interaction, embed=embed)
+
+    response = await send(interaction, file_path=file_path)
+    if deferred:
+        # Followups return the created message itself.
+        new_url = response.attachments[0].url if getattr(response, "attachments", None) else None
+    else:
+        new_url = await uploaded_url(interaction, response)
+    if new_url:
+        await to_thread(cache.remember, file_path, new_url)
+    return response
@@ -0,0 +1,147 @@
+# Pre-rendered ASCII frame file for /badapple: decode the video once, then memory-map it for every playback.
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+from ascii_render import AsciiRenderer
+
+_MAGIC = b"PBAF"
+_VERSION = 1
+# magic, version, width, height, frame stride, frame count, source fps, cache key digest.
+_HEADER = struct.Struct("<4sHHHIId32s")
+_HEADER_SIZE = 64
+
+# Video digests keyed by stat fingerprint, so repeat lookups do not rehash the whole file.
+_digest_memo: Dict[Tuple[str, int, int, int], bytes] = {}
+
+
+def _stat_key(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _video_digest(path: str) -> bytes:
+    memo_key = (os.path.abspath(path),) + _stat_key(path)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = _digest_memo[memo_key] = h.digest()
+    return digest
+
+
+def cache_key(video_path: str, renderer: AsciiRenderer) -> bytes:
+    """Digest of the video bytes plus everything that changes the rendered output."""
+    h = hashlib.sha256(_video_digest(video_path))
+    h.update(f"{renderer.width}x{renderer.height}:{renderer.charset}".encode("ascii"))
+    return h.digest()
+
+
+class FrameCache:
+    """Read-only view over a frame file; frames are served as slices of one shared mapping."""
+
+    def __init__(self, path: str, key: bytes, video_stat: Tuple[int, int, int]):
+        self.path = path
+        self.video_stat = video_stat
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER_SIZE:
+            self._mm.close()
+            raise ValueError("Frame cache is truncated.")
+        magic, version, width, height, stride, count, fps, stored_key = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC or version != _VERSION or stored_key != key:
+            self._mm.close()
+            raise ValueError("Frame cache does not match the video.")
+        if len(self._mm) != _HEADER_SIZE + stride * count:
+            self._mm.close()
+            raise ValueError("Frame cache size does not match its header.")
+        self.width = width
+        self.height = height
+        self.stride = stride
+        self.fps = fps
+        self._count = count
+        self._view = memoryview(self._mm)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def frame(self, index: int) -> memoryview:
+        """Zero-copy bytes of one frame."""
+        if not 0 <= index < self._count:
+            raise IndexError("frame index out of range")
+        start = _HEADER_SIZE + index * self.stride
+        return self._view[start:start + self.stride]
+
+    def frame_text(self, index: int) -> str:
+        return str(self.frame(index), "ascii")
+
+    def is_current(self, video_path: str) -> bool:
+        try:
+            return _stat_key(video_path) == self.video_stat
+        except OSError:
+            return False
+
+    def close(self) -> None:
+        self._view.release()
+        self._mm.close()
+
+
+def build_frame_cache(video_path: str, renderer: AsciiRenderer, out_path: str, key: bytes) -> None:
+    """Decode every frame once and write the fixed-stride frame file atomically."""
+    # Only building needs OpenCV; opening an existing frame file does not load it.
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+
+    stride = renderer.frame_size
+    # A frame that renders to nothing is stored as the blank picture so every slot keeps the same stride.
+    blank = "\n".join([renderer.charset[0] * renderer.width] * renderer.height).encode("ascii")
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(b"\0" * _HEADER_SIZE)
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                data = renderer.render_bytes(frame)
+                out.write(data if len(data) == stride else blank)
+                count += 1
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            out.seek(0)
+            out.write(_HEADER.pack(_MAGIC, _VERSION, renderer.width, renderer.height, stride, count, fps, key))
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        cap.release()
+
+
+def load_frame_cache(video_path: str, renderer: AsciiRenderer, cache_dir: str) -> FrameCache:
+    """Open the frame file for this video and renderer, building it first if it is missing or stale."""
+    video_stat = _stat_key(video_path)
+    key = cache_key(video_path, renderer)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"badapple-{key.hex()[:16]}.frames")
+
+    cached: Optional[FrameCache] = None
+    if os.path.exists(path):
+        try:
+            cached = FrameCache(path, key, video_stat)
+        except ValueError:
+            cached = None
+    if cached is None:
+        build_frame_cache(video_path, renderer, path, key)
+        cached = FrameCache(path, key, video_stat)
+    return cached
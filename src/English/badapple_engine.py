@@ -0,0 +1,220 @@
+# Shared /badapple playback engine: one frame source and one bounded decode pool for every channel.
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from ascii_render import AsciiRenderer
+from badapple_cache import FrameCache, load_frame_cache
+from badapple_playback import FrameHandoff, PlaybackClock, read_frame_at
+
+
+class _LiveDecoder:
+    """One VideoCapture plus its read position; only ever used by one pool thread at a time."""
+
+    def __init__(self, video_path: str):
+        self.video_path = video_path
+        self.cap = None
+        self.position = 0
+
+    def read(self, index: int):
+        if self.cap is None or index < self.position:
+            # Reopening is the only reliable way back; CAP_PROP_POS_FRAMES lands near keyframes.
+            if self.cap is not None:
+                self.cap.release()
+            import cv2  # only live decoding needs OpenCV; cached playback never loads it
+
+            self.cap = cv2.VideoCapture(self.video_path)
+            self.position = 0
+        self.position, frame = read_frame_at(self.cap, self.position, index)
+        return frame
+
+    def release(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class BadappleSession:
+    """One channel's playback: a wall clock, a cursor into the engine's shared frames, and an inbox they arrive in."""
+
+    def __init__(self, engine: "BadappleEngine", channel_id: int, clock: PlaybackClock):
+        self.engine = engine
+        self.channel_id = channel_id
+        self.clock = clock
+        self.stop_event = asyncio.Event()
+        # Holds at most the one frame this session has asked for; see frames().
+        self._inbox = FrameHandoff()
+
+    def close(self) -> None:
+        self.stop_event.set()
+        # Wakes a playback still waiting on a slow decode instead of leaving it parked until the frame lands.
+        self._inbox.close()
+        if self.engine._sessions.get(self.channel_id) is self:
+            del self.engine._sessions[self.channel_id]
+
+    async def frames(self) -> AsyncIterator[Tuple[int, str]]:
+        """Yield (tick, frame) for each send slot, skipping ticks whose slot already passed."""
+        clock = self.clock
+        tick = 0
+        while not self.stop_event.is_set():
+            # The sender asks for the next frame right after a send, so the decode overlaps its wait
+            # for the next slot, and each session has at most one request in the shared pool.
+            self.engine.request(clock.frame_for_tick(tick), self._inbox)
+            done = await self._inbox.get()
+            if done is None or self.stop_event.is_set():
+                return  # closed while the frame was on its way
+            frame = done.result()
+            if frame is None:
+                return
+            yield tick, frame
+            # Resume from the wall clock so a delayed send skips ahead instead of drifting.
+            tick = max(tick + 1, clock.current_tick())
+
+
+class BadappleEngine:
+    """Serves rendered frames to every playback from the mapped frame cache or a shared decode pool.
+
+    Per-channel state is only a clock and a cursor, so memory and CPU follow the distinct frames
+    requested rather than the number of channels. Each session keeps at most one request in the
+    FIFO pool, so sessions are served round-robin and a busy channel cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        renderer: AsciiRenderer,
+        cache_dir: str,
+        max_sessions: int,
+        max_workers: int = 2,
+        fallback_fps: float = 30,
+        recent_frames: int = 64,
+    ):
+        self.video_path = video_path
+        self.renderer = renderer
+        self.cache_dir = cache_dir
+        self.max_sessions = max_sessions
+        self.fallback_fps = fallback_fps
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="badapple")
+        self._frame_cache: Optional[FrameCache] = None
+        self._prepare_lock = asyncio.Lock()
+        self._sessions: Dict[int, BadappleSession] = {}
+        # Live-decode fallback: one capture per pool thread, recently rendered frames, and in-flight de-dupe.
+        self._decoders: List[_LiveDecoder] = [_LiveDecoder(video_path) for _ in range(max_workers)]
+        self._decoders_lock = threading.Lock()
+        self._recent: "OrderedDict[int, Optional[str]]" = OrderedDict()
+        self._recent_limit = recent_frames
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._live_fps: Optional[float] = None
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def pending_decodes(self) -> int:
+        """Frames being decoded or waiting for a pool thread (always 0 when playing from the frame cache)."""
+        return len(self._inflight)
+
+    def session(self, channel_id: int) -> Optional[BadappleSession]:
+        return self._sessions.get(channel_id)
+
+    async def prepare(self) -> Optional[FrameCache]:
+        """Load or build the frame cache; None means playback falls back to live decoding."""
+        async with self._prepare_lock:
+            cached = self._frame_cache
+            if cached is None or not cached.is_current(self.video_path):
+                try:
+                    self._frame_cache = await asyncio.to_thread(
+                        load_frame_cache, self.video_path, self.renderer, self.cache_dir
+                    )
+                except (OSError, ValueError) as e:
+                    print(f"Bad Apple frame cache unavailable, decoding live: {e}")
+                    self._frame_cache = None
+                self._recent.clear()
+            return self._frame_cache
+
+    async def _fps(self) -> float:
+        if self._frame_cache is not None:
+            return self._frame_cache.fps or self.fallback_fps
+        if self._live_fps is None:
+            self._live_fps = await asyncio.get_running_loop().run_in_executor(self._executor, self._probe_fps)
+        return self._live_fps
+
+    def _probe_fps(self) -> float:
+        import cv2
+
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            return cap.get(cv2.CAP_PROP_FPS) or self.fallback_fps
+        finally:
+            cap.release()
+
+    def _has_room(self, channel_id: int) -> bool:
+        return channel_id not in self._sessions and len(self._sessions) < self.max_sessions
+
+    async def open_session(self, channel_id: int, interval: float) -> Optional[BadappleSession]:
+        """Start a cursor for a channel; None when the cap is reached or the channel already has one."""
+        if not self._has_room(channel_id):
+            return None
+        await self.prepare()
+        fps = await self._fps()
+        # Checked again after the last await: other calls may have taken the last slot, or this channel.
+        if not self._has_room(channel_id):
+            return None
+        session = BadappleSession(self, channel_id, PlaybackClock(fps, interval))
+        self._sessions[channel_id] = session
+        return session
+
+    def request(self, index: int, inbox: FrameHandoff) -> None:
+        """Deliver rendered frame `index` (None past the end of the video) to `inbox` as a done future.
+
+        Sessions hold at most one request at a time, so the inbox always has room.
+        """
+        loop = asyncio.get_running_loop()
+        cached = self._frame_cache
+        if cached is not None or index in self._recent:
+            done = loop.create_future()
+            if cached is not None:
+                done.set_result(cached.frame_text(index) if index < len(cached) else None)
+            else:
+                self._recent.move_to_end(index)
+                done.set_result(self._recent[index])
+            inbox.put(done)
+            return
+
+        future = self._inflight.get(index)
+        if future is None:
+            future = self._inflight[index] = loop.run_in_executor(self._executor, self._decode, index)
+            future.add_done_callback(lambda f, i=index: self._remember(i, f))
+        # Several sessions can wait on one decode; a session that closes meanwhile just drops its copy.
+        future.add_done_callback(inbox.put)
+
+    def _remember(self, index: int, future: asyncio.Future) -> None:
+        self._inflight.pop(index, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._recent[index] = future.result()
+        while len(self._recent) > self._recent_limit:
+            self._recent.popitem(last=False)
+
+    def _decode(self, index: int) -> Optional[str]:
+        # Take the idle capture that can reach this frame with the fewest grabs.
+        with self._decoders_lock:
+            behind = [d for d in self._decoders if d.position <= index]
+            decoder = max(behind, key=lambda d: d.position) if behind else self._decoders[0]
+            self._decoders.remove(decoder)
+        try:
+            frame = decoder.read(index)
+            return None if frame is None else self.renderer.render(frame)
+        finally:
+            with self._decoders_lock:
+                self._decoders.append(decoder)
+
+    def shutdown(self) -> None:
+        for session in list(self._sessions.values()):
+            session.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for decoder in self._decoders:
+            decoder.release()
@@ -0,0 +1,109 @@
+# Playback plumbing for /badapple: wall-clock frame scheduling, the decode-to-session handoff and edit pacing.
+import asyncio
+import time
+from typing import Any, Optional, Tuple
+
+
+class PlaybackClock:
+    """Maps send ticks (one message every `interval` seconds) to the video frame due at that moment."""
+
+    def __init__(self, fps: float, interval: float, start: Optional[float] = None):
+        if fps <= 0 or interval <= 0:
+            raise ValueError("fps and interval must be positive.")
+        self.fps = fps
+        self.interval = interval
+        self.start = time.monotonic() if start is None else start
+
+    def tick_time(self, tick: int) -> float:
+        return self.start + tick * self.interval
+
+    def frame_for_tick(self, tick: int) -> int:
+        return int(tick * self.interval * self.fps)
+
+    def current_tick(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = time.monotonic()
+        return max(0, int((now - self.start) / self.interval))
+
+
+def read_frame_at(cap, position: int, index: int) -> Tuple[int, Optional[object]]:
+    """Advance `cap` from `position` to `index` and decode only that frame.
+
+    grab() demuxes the frames in between without the retrieve/convert step. Returns the new
+    position and the frame, or None once the video runs out.
+    """
+    while position < index:
+        if not cap.grab():
+            return position, None
+        position += 1
+    ok, frame = cap.read()
+    if not ok:
+        return position, None
+    return position + 1, frame
+
+
+_EMPTY = object()
+
+
+class FrameHandoff:
+    """One-slot mailbox from the frame producers to one event-loop consumer; nothing blocks or polls.
+
+    Producers run on the loop: direct puts for cached frames and done callbacks of decode futures.
+    The consumer asks for one item at a time, so put() never finds the slot taken; if it does, it
+    raises instead of waiting, since waiting would stall the loop. The consumer awaits a future that
+    put() resolves, so an idle playback costs nothing. close() ends the stream and wakes the consumer.
+    """
+
+    def __init__(self):
+        self._item: Any = _EMPTY
+        self._waiter: Optional[asyncio.Future] = None
+        self._closed = False
+
+    def _wake_consumer(self) -> None:
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def put(self, item) -> bool:
+        """Hand over an item; returns False once the consumer has gone away."""
+        if self._closed:
+            return False
+        if self._item is not _EMPTY:
+            raise RuntimeError("FrameHandoff already holds an item the consumer has not taken.")
+        self._item = item
+        self._wake_consumer()
+        return True
+
+    async def get(self):
+        """Next item, or None once the handoff is closed and drained."""
+        while True:
+            if self._item is not _EMPTY:
+                item, self._item = self._item, _EMPTY
+                return item
+            if self._closed:
+                return None
+            waiter = self._waiter = asyncio.get_running_loop().create_future()
+            await waiter
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake_consumer()
+
+
+class EditPacer:
+    """Spaces out edits of one message, backing off on observed rate limits and creeping back afterwards."""
+
+    def __init__(self, min_interval: float, max_interval: float = 30.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+    def on_success(self, elapsed: float) -> None:
+        if elapsed > self.interval:
+            # The request itself sat out a rate limit, so that is the real pace the route allows.
+            self.interval = min(self.max_interval, elapsed)
+        else:
+            self.interval = max(self.min_interval, self.interval - self.min_interval * 0.1)
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        self.interval = min(self.max_interval, max(self.interval * 2, retry_after))
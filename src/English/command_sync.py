@@ -0,0 +1,50 @@
+# Sync the app-command tree only when its schema changed since the last successful sync.
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from discord import app_commands
+
+
+def tree_hash(tree: app_commands.CommandTree) -> str:
+    """SHA-256 of the global command payload exactly as tree.sync() would upload it, in canonical JSON."""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda c: (c["type"], c["name"]))
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _load_state(path: str) -> Dict[str, str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: str, state: Dict[str, str]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def sync_if_changed(tree: app_commands.CommandTree, state_path: str, force: bool = False) -> Optional[int]:
+    """Sync global commands unless this application already has the same schema registered.
+
+    The state file maps application id -> hash of the last synced schema, so both bots can share
+    one file. Returns the number of commands synced, or None when the sync was skipped. Delete
+    the file (or pass force=True) after changing commands from outside this process.
+    """
+    key = str(tree.client.application_id)
+    digest = tree_hash(tree)
+    state = _load_state(state_path)
+    if not force and state.get(key) == digest:
+        return None
+    synced = await tree.sync()
+    # Re-read so the other bot's entry written in the meantime is kept.
+    state = _load_state(state_path)
+    state[key] = digest
+    _save_state(state_path, state)
+    return len(synced)
@@ -0,0 +1,865 @@
+# Offline load test for either bot: a local stand-in for Discord's gateway and REST API, scripted workloads,
+# and a latency / loop-lag / memory report.
+#
+#   python loadtest.py main.py quote_storm --count 500 --concurrency 100
+#   python loadtest.py main.py badapple --sessions 8 --duration 20
+#   python loadtest.py main.py poll_spam --users 50 --count 400
+#   python loadtest.py Anywhere/main2.py encode --count 20 --size 20000
+#   python loadtest.py main.py badapple --edit --random-429 0.05 --json report.json
+#
+# The bot runs in this process against a scratch copy of its folder, so quotes, polls and caches
+# are left alone. The fake Discord and the workload run on their own thread and event loop, so
+# the loop lag measured on the bot's loop is the bot's own.
+import argparse
+import asyncio
+import collections
+import csv
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import aiohttp
+import yarl
+from aiohttp import web
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_APP_ID = 100000000000000001
+_GUILD_ID = 100000000000000002
+_BOT_USER = {
+    "id": str(_APP_ID), "username": "loadtest-bot", "discriminator": "0000", "global_name": None, "avatar": None,
+    "bot": True,
+}
+# Files bigger than this are symlinked into the scratch copy instead of copied (the bots never write them).
+_LINK_THRESHOLD = 8 << 20
+
+# Option type ids used by the application-command payloads below.
+_STRING, _INTEGER, _BOOLEAN, _USER = 3, 4, 5, 6
+
+
+def _now_iso() -> str:
+    return datetime.now(tz=timezone.utc).isoformat()
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.5) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1024)
+
+
+def _json(body: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # discord.py only decodes bodies whose Content-Type is exactly application/json (no charset).
+    return web.Response(
+        body=json.dumps(body).encode(), status=status, headers={**(headers or {}), "Content-Type": "application/json"}
+    )
+
+
+class _Interaction:
+    """What the fake Discord saw of one interaction: when it was sent and when the bot answered."""
+
+    __slots__ = ("id", "token", "channel_id", "sent_at", "first_at", "done_at", "done", "message_id")
+
+    def __init__(self, interaction_id: int, token: str, channel_id: int, message_id: Optional[int] = None):
+        self.id = interaction_id
+        self.token = token
+        self.channel_id = channel_id
+        self.sent_at = 0.0
+        self.first_at: Optional[float] = None
+        self.done_at: Optional[float] = None
+        self.done = asyncio.Event()
+        # The message this interaction's @original refers to (its own reply, or the clicked message).
+        self.message_id = message_id
+
+    def responded(self, final: bool) -> None:
+        now = time.perf_counter()
+        if self.first_at is None:
+            self.first_at = now
+        if final and self.done_at is None:
+            self.done_at = now
+            self.done.set()
+
+
+class FakeDiscord:
+    """Just enough of the gateway and REST API for the bots' commands, with Discord-style 429s.
+
+    Channel message routes are limited to `channel_limit` requests per `channel_window` seconds
+    per channel, like Discord's per-channel bucket, and answer 429 with retry_after past that.
+    `random_429` additionally rate-limits that share of channel and webhook requests at random.
+    Every REST call waits `latency` seconds first.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.03,
+        channel_limit: int = 5,
+        channel_window: float = 5.0,
+        random_429: float = 0.0,
+        retry_after: float = 0.5,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.channel_limit = channel_limit
+        self.channel_window = channel_window
+        self.random_429 = random_429
+        self.retry_after = retry_after
+        self.port = 0
+        self._random = random.Random(seed)
+        self._ids = itertools.count(200000000000000000)
+        self._ws: Optional[web.WebSocketResponse] = None
+        self._seq = 0
+        self._ready = asyncio.Event()
+        self._runner: Optional[web.AppRunner] = None
+        self._commands: List[Dict] = []
+        self._interactions: Dict[int, _Interaction] = {}
+        self._by_token: Dict[str, _Interaction] = {}
+        self.messages: Dict[int, Dict] = {}
+        self._channel_messages: Dict[int, Deque[int]] = collections.defaultdict(lambda: collections.deque(maxlen=200))
+        self._channel_hits: Dict[int, Deque[float]] = collections.defaultdict(collections.deque)
+        # Per channel: monotonic times of message creates and edits (badapple frames, poll edits).
+        self.channel_writes: Dict[int, List[float]] = collections.defaultdict(list)
+        self.message_edits: Dict[int, int] = collections.Counter()
+        self.requests: Dict[str, int] = collections.Counter()
+        self.served_429 = 0
+        self.unknown: Dict[str, int] = collections.Counter()
+        self.last_request = time.monotonic()
+
+    def snowflake(self) -> int:
+        return next(self._ids)
+
+    # Server plumbing.
+
+    async def start(self) -> int:
+        app = web.Application(client_max_size=64 << 20)
+        app.router.add_get("/gateway", self._gateway)
+        app.router.add_route("*", "/api/v10/{path:.*}", self._rest)
+        app.router.add_get("/attachments/{path:.*}", self._attachment)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self._ws = ws
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": 41250}})
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            payload = json.loads(msg.data)
+            if payload["op"] == 1:
+                await ws.send_json({"op": 11})
+            elif payload["op"] == 2:
+                await self.dispatch("READY", {
+                    "v": 10,
+                    "user": _BOT_USER,
+                    "guilds": [],
+                    "session_id": "loadtest",
+                    "resume_gateway_url": f"ws://127.0.0.1:{self.port}/gateway",
+                    "application": {"id": str(_APP_ID), "flags": 0},
+                    "shard": [0, 1],
+                })
+                self._ready.set()
+        return ws
+
+    async def dispatch(self, event: str, data: Dict) -> None:
+        self._seq += 1
+        await self._ws.send_json({"op": 0, "t": event, "s": self._seq, "d": data})
+
+    async def wait_connected(self) -> None:
+        await self._ready.wait()
+
+    async def quiet(self, idle: float = 1.0, limit: float = 60.0) -> float:
+        """Wait until the bot has made no REST call for `idle` seconds (work queued behind the replies); returns the wait."""
+        started = time.monotonic()
+        while time.monotonic() - started < limit:
+            remaining = self.last_request + idle - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        return time.monotonic() - started
+
+    async def _attachment(self, request: web.Request) -> web.Response:
+        # Uploaded-file URLs point here so AttachmentCache's liveness checks succeed.
+        return web.Response(body=b"", content_type="application/octet-stream")
+
+    # REST.
+
+    def _rate_limited(self, channel_id: Optional[int]) -> Optional[float]:
+        if self.random_429 and self._random.random() < self.random_429:
+            return self.retry_after
+        if channel_id is None or not self.channel_limit:
+            return None
+        now = time.monotonic()
+        hits = self._channel_hits[channel_id]
+        while hits and hits[0] <= now - self.channel_window:
+            hits.popleft()
+        if len(hits) >= self.channel_limit:
+            return hits[0] + self.channel_window - now
+        hits.append(now)
+        return None
+
+    def _too_many(self, retry_after: float) -> web.Response:
+        self.served_429 += 1
+        # discord.py treats a 429 without a Via header as a Cloudflare ban instead of a rate limit.
+        headers = {"Via": "1.1 google", "Retry-After": f"{retry_after:.3f}", "X-RateLimit-Scope": "user"}
+        body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": False}
+        return _json(body, status=429, headers=headers)
+
+    async def _body(self, request: web.Request) -> Dict:
+        if request.content_type.startswith("multipart/"):
+            form = await request.post()
+            body = json.loads(form.get("payload_json") or "{}")
+            body["_files"] = [
+                {"filename": f.filename, "size": len(f.file.read())} for key, f in form.items() if key.startswith("files[")
+            ]
+            return body
+        if request.can_read_body:
+            return await request.json()
+        return {}
+
+    def _message(self, channel_id: int, body: Dict, message_type: int = 0) -> Dict:
+        message_id = self.snowflake()
+        attachments = [
+            {
+                "id": str(self.snowflake()),
+                "filename": f["filename"],
+                "size": f["size"],
+                "url": f"http://127.0.0.1:{self.port}/attachments/{message_id}/{f['filename']}"
+                f"?ex={int(time.time()) + 86400:x}&is={int(time.time()):x}&hm=0",
+                "proxy_url": f"http://127.0.0.1:{self.port}/attachments/{message_id}/{f['filename']}",
+            }
+            for f in body.get("_files", [])
+        ]
+        message = {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "author": _BOT_USER,
+            "content": body.get("content") or "",
+            "timestamp": _now_iso(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": attachments,
+            "embeds": body.get("embeds") or [],
+            "components": body.get("components") or [],
+            "pinned": False,
+            "type": message_type,
+            "flags": body.get("flags") or 0,
+        }
+        self.messages[message_id] = message
+        history = self._channel_messages[channel_id]
+        if len(history) == history.maxlen:
+            # The fake shares the bot's process, so keep what it holds (and adds to the RSS figures) bounded.
+            self.messages.pop(history[0], None)
+        history.append(message_id)
+        self.channel_writes[channel_id].append(time.monotonic())
+        return message
+
+    def _edit(self, message_id: int, body: Dict) -> Optional[Dict]:
+        message = self.messages.get(message_id)
+        if message is None:
+            return None
+        for key in ("content", "embeds", "components"):
+            if key in body:
+                message[key] = body[key] if body[key] is not None else ([] if key != "content" else "")
+        message["edited_timestamp"] = _now_iso()
+        self.message_edits[message_id] += 1
+        self.channel_writes[int(message["channel_id"])].append(time.monotonic())
+        return message
+
+    async def _rest(self, request: web.Request) -> web.StreamResponse:
+        self.last_request = time.monotonic()
+        await asyncio.sleep(self.latency)
+        parts = request.match_info["path"].strip("/").split("/")
+        method = request.method
+        route = f"{method} /" + "/".join(p if not p.isdigit() and not p.startswith("tok") else "{id}" for p in parts)
+        self.requests[route] += 1
+
+        if parts == ["users", "@me"]:
+            return _json(_BOT_USER)
+        if parts == ["oauth2", "applications", "@me"]:
+            return _json({
+                "id": str(_APP_ID), "name": "loadtest", "description": "", "icon": None, "bot_public": False,
+                "bot_require_code_grant": False, "owner": _BOT_USER, "verify_key": "0" * 64, "flags": 0,
+            })
+        if parts[:1] == ["gateway"]:
+            return _json({
+                "url": f"ws://127.0.0.1:{self.port}/gateway",
+                "shards": 1,
+                "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+            })
+        if parts[:1] == ["applications"] and parts[2:3] == ["commands"]:
+            if method == "PUT":
+                defaults = {"type": 1, "description": "", "options": [], "default_member_permissions": None,
+                            "nsfw": False}
+                self._commands = [
+                    {**defaults, **c, "id": str(self.snowflake()), "application_id": str(_APP_ID), "version": "1"}
+                    for c in await self._body(request)
+                ]
+            return _json(self._commands)
+
+        if parts[:1] == ["interactions"] and parts[3:4] == ["callback"]:
+            return await self._callback(int(parts[1]), await self._body(request))
+        if parts[:1] == ["webhooks"]:
+            return await self._webhook(request, parts)
+        if parts[:1] == ["channels"] and parts[2:3] == ["messages"]:
+            return await self._channel(request, int(parts[1]), parts[3:])
+
+        self.unknown[route] += 1
+        return _json({"message": "Unknown route", "code": 0}, status=404)
+
+    async def _callback(self, interaction_id: int, body: Dict) -> web.Response:
+        interaction = self._interactions.get(interaction_id)
+        if interaction is None:
+            return _json({"message": "Unknown interaction", "code": 10062}, status=404)
+        kind = body.get("type")
+        data = body.get("data") or {}
+        data["_files"] = body.get("_files", [])
+        result = {"type": kind}
+        if kind == 4:  # channel message
+            message = self._message(interaction.channel_id, data, message_type=20)
+            interaction.message_id = int(message["id"])
+            result["message"] = message
+            interaction.responded(final=True)
+        elif kind == 5:  # deferred message: the followup finishes it
+            interaction.responded(final=False)
+        elif kind == 6:  # deferred component update
+            interaction.responded(final=True)
+        elif kind == 7:  # component update: edits the clicked message
+            message = self._edit(interaction.message_id, data)
+            if message is not None:
+                result["message"] = message
+            interaction.responded(final=True)
+        else:
+            interaction.responded(final=True)
+        return _json({"interaction": {"id": str(interaction_id), "type": 2}, "resource": result})
+
+    async def _webhook(self, request: web.Request, parts: List[str]) -> web.Response:
+        interaction = self._by_token.get(parts[2]) if len(parts) > 2 else None
+        if interaction is None:
+            return _json({"message": "Unknown webhook", "code": 10015}, status=404)
+        retry_after = self._rate_limited(None)
+        if retry_after is not None:
+            return self._too_many(retry_after)
+        if request.method == "POST" and len(parts) == 3:
+            message = self._message(interaction.channel_id, await self._body(request))
+            interaction.responded(final=True)
+            return _json(message)
+        if parts[3:5] == ["messages", "@original"]:
+            if request.method == "GET":
+                message = self.messages.get(interaction.message_id)
+            else:
+                message = self._edit(interaction.message_id, await self._body(request))
+                interaction.responded(final=True)
+            if message is None:
+                return _json({"message": "Unknown message", "code": 10008}, status=404)
+            return _json(message)
+        self.unknown[f"{request.method} webhooks/.../{'/'.join(parts[3:])}"] += 1
+        return _json({"message": "Unknown route", "code": 0}, status=404)
+
+    async def _channel(self, request: web.Request, channel_id: int, rest: List[str]) -> web.Response:
+        if request.method == "GET" and not rest:
+            limit = int(request.query.get("limit", 50))
+            ids = list(self._channel_messages[channel_id])[-limit:]
+            return _json([self.messages[i] for i in reversed(ids)])
+        retry_after = self._rate_limited(channel_id)
+        if retry_after is not None:
+            return self._too_many(retry_after)
+        if request.method == "POST" and not rest:
+            return _json(self._message(channel_id, await self._body(request)))
+        if request.method == "PATCH" and len(rest) == 1:
+            message = self._edit(int(rest[0]), await self._body(request))
+            if message is None:
+                return _json({"message": "Unknown message", "code": 10008}, status=404)
+            return _json(message)
+        return _json({"message": "Unknown route", "code": 0}, status=404)
+
+    # Interactions.
+
+    def _channel_payload(self, channel_id: int) -> Dict:
+        return {
+            "id": str(channel_id), "type": 0, "name": f"load-{channel_id}", "position": 0,
+            "guild_id": str(_GUILD_ID), "permission_overwrites": [], "nsfw": False, "topic": None,
+            "last_message_id": None, "rate_limit_per_user": 0, "parent_id": None, "flags": 0,
+        }
+
+    @staticmethod
+    def user_payload(user_id: int) -> Dict:
+        return {
+            "id": str(user_id), "username": f"user{user_id}", "discriminator": "0000", "global_name": None,
+            "avatar": None,
+        }
+
+    async def interact(
+        self,
+        interaction_type: int,
+        data: Dict,
+        channel_id: int,
+        user_id: int = 1,
+        message: Optional[Dict] = None,
+        permissions: str = "0",
+    ) -> _Interaction:
+        """Send one INTERACTION_CREATE and return its record; await record.done for the final response."""
+        interaction_id = self.snowflake()
+        token = f"tok{interaction_id}"
+        record = _Interaction(interaction_id, token, channel_id, int(message["id"]) if message else None)
+        self._interactions[interaction_id] = record
+        self._by_token[token] = record
+        payload = {
+            "id": str(interaction_id),
+            "application_id": str(_APP_ID),
+            "type": interaction_type,
+            "data": data,
+            "guild_id": str(_GUILD_ID),
+            "channel_id": str(channel_id),
+            "channel": self._channel_payload(channel_id),
+            "member": {
+                "user": self.user_payload(user_id), "roles": [], "joined_at": _now_iso(), "deaf": False,
+                "mute": False, "flags": 0, "permissions": permissions,
+            },
+            "token": token,
+            "version": 1,
+            "locale": "en-US",
+            "guild_locale": "en-US",
+            "app_permissions": "0",
+            "attachment_size_limit": 10 << 20,
+            "entitlements": [],
+            "authorizing_integration_owners": {"0": str(_GUILD_ID)},
+            "context": 0,
+        }
+        if message is not None:
+            payload["message"] = message
+        record.sent_at = time.perf_counter()
+        await self.dispatch("INTERACTION_CREATE", payload)
+        return record
+
+    def slash(self, name: str, channel_id: int, user_id: int = 1, permissions: str = "0", **options):
+        """INTERACTION_CREATE for /name; options are (type, value) pairs."""
+        data: Dict[str, Any] = {"id": "0", "name": name, "type": 1, "guild_id": str(_GUILD_ID), "options": []}
+        for key, (option_type, value) in options.items():
+            if option_type == _USER:
+                value = str(value)  # snowflakes travel as strings, and resolved data is keyed by them
+                data.setdefault("resolved", {}).setdefault("users", {})[value] = self.user_payload(int(value))
+            data["options"].append({"name": key, "type": option_type, "value": value})
+        return self.interact(2, data, channel_id, user_id, permissions=permissions)
+
+    def click(self, message: Dict, custom_id: str, user_id: int):
+        data = {"custom_id": custom_id, "component_type": 2}
+        return self.interact(3, data, int(message["channel_id"]), user_id, message=message)
+
+
+class _Interactions:
+    """Runs interactions with bounded concurrency and collects their latencies."""
+
+    def __init__(self, concurrency: int, timeout: float):
+        self._slots = asyncio.Semaphore(concurrency)
+        self.timeout = timeout
+        self.first: List[float] = []
+        self.done: List[float] = []
+        self.timeouts = 0
+
+    async def run(self, start: Callable[[], Any]) -> Optional[_Interaction]:
+        async with self._slots:
+            record = await start()
+            try:
+                await asyncio.wait_for(record.done.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return None
+            self.first.append(record.first_at - record.sent_at)
+            self.done.append(record.done_at - record.sent_at)
+            return record
+
+    def report(self) -> Dict:
+        return {
+            "interactions": len(self.done) + self.timeouts,
+            "timeouts": self.timeouts,
+            "first_response": _percentiles(self.first),
+            "final_response": _percentiles(self.done),
+        }
+
+
+# Workloads. Each runs on the fake Discord's loop and returns its part of the report.
+
+async def quote_storm(fake: FakeDiscord, args) -> Dict:
+    """Many concurrent /quote calls, spread over --channels channels."""
+    runner = _Interactions(args.concurrency, args.timeout)
+    options = {"search": (_STRING, args.search)} if args.search else {}
+    await asyncio.gather(*(
+        runner.run(lambda i=i: fake.slash("quote", 1000 + i % args.channels, user_id=1 + i % 997, **options))
+        for i in range(args.count)
+    ))
+    return runner.report()
+
+
+async def badapple(fake: FakeDiscord, args) -> Dict:
+    """--sessions parallel /badapple playbacks for --duration seconds, then /stopapple in each channel."""
+    runner = _Interactions(args.sessions, args.timeout)
+    channels = [2000 + i for i in range(args.sessions)]
+    started = time.monotonic()
+    await asyncio.gather(*(
+        runner.run(lambda c=c: fake.slash("badapple", c, edit=(_BOOLEAN, args.edit))) for c in channels
+    ))
+    await asyncio.sleep(max(0.0, args.duration - (time.monotonic() - started)))
+    elapsed = time.monotonic() - started
+    stop = _Interactions(args.sessions, args.timeout)
+    await asyncio.gather(*(stop.run(lambda c=c: fake.slash("stopapple", c)) for c in channels))
+
+    frames, gaps = [], []
+    for channel in channels:
+        writes = [t for t in fake.channel_writes[channel] if t <= started + elapsed]
+        frames.append(len(writes))
+        gaps.extend(b - a for a, b in zip(writes, writes[1:]))
+    report = runner.report()
+    report.update({
+        "frames_per_session": frames,
+        "fps_per_session": round(sum(frames) / len(frames) / elapsed, 3) if frames else 0,
+        "frame_interval": _percentiles(gaps),
+        "stop": stop.report(),
+    })
+    return report
+
+
+async def poll_spam(fake: FakeDiscord, args) -> Dict:
+    """One /add_quote_poll, then --count button clicks from --users users that never reach the yes threshold."""
+    opener = _Interactions(1, args.timeout)
+    record = await opener.run(lambda: fake.slash(
+        "add_quote_poll", 3000, message=(_STRING, "load test quote"), author=(_USER, 42)
+    ))
+    if record is None or record.message_id is None:
+        return {"error": "poll was not posted", **opener.report()}
+    poll_message = fake.messages[record.message_id]
+
+    runner = _Interactions(args.concurrency, args.timeout)
+
+    def click(i: int):
+        user = 1 + i % args.users
+        # Only users 1 and 2 ever vote yes, so the poll (which needs 3) stays open for the whole run.
+        vote = "yes" if user <= 2 and i % 2 else "no"
+        return fake.click(poll_message, f"quote_poll:{vote}", user)
+
+    await asyncio.gather(*(runner.run(lambda i=i: click(i)) for i in range(args.count)))
+    await fake.quiet(2.0)  # let batched edits land
+    report = runner.report()
+    report["poll_message_edits"] = fake.message_edits[record.message_id]
+    return report
+
+
+async def encode(fake: FakeDiscord, args) -> Dict:
+    """--count /encode calls of --size characters each (main2.py)."""
+    rng = random.Random(1)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "quote", "apple", "bad", "tilley", "encode"]
+    runner = _Interactions(args.concurrency, args.timeout)
+
+    def text() -> str:
+        out = []
+        while sum(map(len, out)) + len(out) < args.size:
+            out.append(rng.choice(words))
+        return " ".join(out)[:args.size]
+
+    texts = [text() for _ in range(args.count)]
+    await asyncio.gather(*(
+        runner.run(lambda i=i: fake.slash("encode", 4000 + i % args.channels, user_id=10 + i, text=(_STRING, texts[i])))
+        for i in range(args.count)
+    ))
+    return runner.report()
+
+
+_WORKLOADS = {"quote_storm": quote_storm, "badapple": badapple, "poll_spam": poll_spam, "encode": encode}
+
+
+# Running the bot.
+
+class _LoopThread:
+    """An event loop on a daemon thread, for the fake Discord and the workload driver."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="fake-discord", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+def _bot_root(script: str) -> str:
+    # The folder holding the shared modules: main.py's own, or the parent of Anywhere/ for main2.py.
+    directory = os.path.dirname(os.path.abspath(script))
+    return directory if os.path.exists(os.path.join(directory, "outbound.py")) else os.path.dirname(directory)
+
+
+def _scratch_copy(root: str, dest: str) -> None:
+    def copy(src: str, dst: str) -> None:
+        name = os.path.basename(src)
+        if os.path.getsize(src) > _LINK_THRESHOLD and not name.startswith("quotes"):
+            os.symlink(os.path.abspath(src), dst)
+        else:
+            shutil.copy2(src, dst)
+
+    shutil.copytree(
+        root, dest, ignore=shutil.ignore_patterns("cache", "__pycache__", "token.txt", "*.tmp"), copy_function=copy
+    )
+
+
+def _seed_assets(bot_dir: str, quotes: int, video: Optional[str], need_video: bool) -> None:
+    """Give the scratch copy something to serve when the checkout has no quotes or video of its own."""
+    rng = random.Random(2)
+    words = ["apple", "bad", "quote", "lorem", "ipsum", "tilley", "shadow", "frame", "storm", "poll", "vote"]
+    rows = [
+        (" ".join(rng.choice(words) for _ in range(rng.randint(3, 12))), f"author{i % 40}",
+         str(1600000000 + i), str(300000000000000000 + i))
+        for i in range(quotes)
+    ]
+    csv_path = os.path.join(bot_dir, "quotes.csv")
+    if quotes and not os.path.exists(csv_path) and not os.path.exists(os.path.join(bot_dir, "quotes.sqlite3")):
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows(rows)
+    txt_path = os.path.join(bot_dir, "quotes.txt")
+    if quotes and not os.path.exists(txt_path):
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{row[0]}\n" for row in rows)
+
+    video_path = os.path.join(bot_dir, "badapple.mp4")
+    if video:
+        if os.path.lexists(video_path):
+            os.remove(video_path)
+        os.symlink(os.path.abspath(video), video_path)
+    elif need_video and not os.path.exists(video_path):
+        # Only when it is played, so other workloads do not pay for loading OpenCV here.
+        _synthetic_video(video_path)
+
+
+def _synthetic_video(path: str, seconds: int = 60, fps: int = 30) -> None:
+    # A disc sweeping across the frame: enough for the decode and render paths, and it changes every frame.
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        print("No badapple.mp4 and OpenCV is not installed; pass --video for the badapple workload.")
+        return
+    width, height = 160, 120
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for i in range(seconds * fps):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        cv2.circle(frame, (i * 3 % width, height // 2), 30, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def _import_bot(path: str):
+    directory = os.path.dirname(path)
+    sys.path.insert(0, directory)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+async def _watch_lag(samples: List[float], interval: float = 0.05) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def _run(module, fake: FakeDiscord, driver: _LoopThread, workload, args) -> Dict:
+    bot = module.bot
+    lag: List[float] = []
+    bot_task = asyncio.create_task(bot.start("loadtest-token"))
+    await asyncio.wait_for(asyncio.wrap_future(driver.submit(fake.wait_connected())), 30)
+    await asyncio.wait_for(bot.wait_until_ready(), 30)
+    await asyncio.sleep(0.5)  # on_ready's command sync and warm-up tasks
+
+    rss_before = _rss_mb()
+    lag_task = asyncio.create_task(_watch_lag(lag))
+    started = time.perf_counter()
+    report = await asyncio.wrap_future(driver.submit(workload(fake, args)))
+    elapsed = time.perf_counter() - started
+    settle = await asyncio.wrap_future(driver.submit(fake.quiet()))
+    lag_task.cancel()
+    rss_after = _rss_mb()
+
+    outbound = getattr(module, "_outbound", None)
+    report.update({
+        "wall_s": round(elapsed, 3),
+        "settle_s": round(settle, 3),
+        "loop_lag": _percentiles(lag),
+        "memory_mb": {
+            "rss_before": rss_before and round(rss_before, 1),
+            "rss_after": rss_after and round(rss_after, 1),
+            "peak_rss": _peak_rss_mb() and round(max(_peak_rss_mb(), rss_after or 0), 1),
+        },
+        "rest": {
+            "requests": sum(fake.requests.values()),
+            "by_route": dict(fake.requests.most_common()),
+            "served_429": fake.served_429,
+            "bot_429s_seen_by_outbound": outbound.rate_limited if outbound is not None else None,
+            "unknown_routes": dict(fake.unknown),
+        },
+    })
+    await bot.close()
+    try:
+        await asyncio.wait_for(bot_task, 10)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass
+    return report
+
+
+def _print_report(report: Dict) -> None:
+    def line(label: str, stats: Dict) -> str:
+        if not stats.get("count"):
+            return f"{label:<16} -"
+        return f"{label:<16} n={stats['count']:<6} p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms"
+
+    print(f"\n{report['bot']} / {report['workload']}: {report.get('interactions', 0)} interactions "
+          f"in {report['wall_s']}s (+{report['settle_s']}s until the bot went quiet), "
+          f"{report.get('timeouts', 0)} timed out")
+    print(line("first response", report.get("first_response", {})))
+    print(line("final response", report.get("final_response", {})))
+    print(line("loop lag", report["loop_lag"]))
+    if "frame_interval" in report:
+        print(line("frame interval", report["frame_interval"]))
+        print(f"{'frames':<16} {report['frames_per_session']} ({report['fps_per_session']} fps per session)")
+    if "poll_message_edits" in report:
+        print(f"{'poll edits':<16} {report['poll_message_edits']} for {report['interactions']} clicks")
+    memory = report["memory_mb"]
+    print(f"{'memory':<16} rss {memory['rss_before']} -> {memory['rss_after']} MB, peak {memory['peak_rss']} MB")
+    rest = report["rest"]
+    print(f"{'rest':<16} {rest['requests']} requests, {rest['served_429']} answered 429, "
+          f"{rest['bot_429s_seen_by_outbound']} surfaced to the outbound scheduler")
+    if rest["unknown_routes"]:
+        print(f"{'unknown routes':<16} {rest['unknown_routes']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test a bot against a local fake Discord.")
+    parser.add_argument("script", help="bot entry point, e.g. main.py or Anywhere/main2.py")
+    parser.add_argument("workload", choices=sorted(_WORKLOADS))
+    parser.add_argument("--count", type=int, default=200, help="interactions (clicks for poll_spam)")
+    parser.add_argument("--concurrency", type=int, default=50, help="interactions in flight at once")
+    parser.add_argument("--channels", type=int, default=20, help="channels to spread interactions over")
+    parser.add_argument("--search", default=None, help="quote_storm: search term instead of random quotes")
+    parser.add_argument("--sessions", type=int, default=4, help="badapple: parallel playbacks")
+    parser.add_argument("--duration", type=float, default=15.0, help="badapple: seconds to play")
+    parser.add_argument("--edit", action="store_true", help="badapple: animate by editing one message")
+    parser.add_argument("--users", type=int, default=50, help="poll_spam: distinct voters")
+    parser.add_argument("--size", type=int, default=5000, help="encode: characters per /encode")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each final response")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds added to every REST call")
+    parser.add_argument("--channel-limit", type=int, default=5, help="channel requests allowed per window (0: off)")
+    parser.add_argument("--channel-window", type=float, default=5.0, help="seconds per channel rate-limit window")
+    parser.add_argument("--random-429", type=float, default=0.0, help="share of channel/webhook calls to rate-limit")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="retry_after sent with random 429s")
+    parser.add_argument("--seed-quotes", type=int, default=2000, help="synthetic quotes when the folder has none")
+    parser.add_argument("--video", help="badapple: video to play (default: the folder's own, else a synthetic one)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the scratch copy of the bot folder")
+    parser.add_argument("--verbose", action="store_true", help="show discord.py's warnings (rate limits etc.)")
+    args = parser.parse_args(argv)
+
+    # Quiet at the handler, not the loggers: the bots count 429s from discord.py's warning records.
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.WARNING if args.verbose else logging.ERROR)
+    logging.basicConfig(level=logging.WARNING, handlers=[handler])
+    root = _bot_root(args.script)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    bot_dir = os.path.join(workdir, "bot")
+    _scratch_copy(root, bot_dir)
+    _seed_assets(bot_dir, args.seed_quotes, args.video, args.workload == "badapple")
+    script = os.path.join(bot_dir, os.path.relpath(os.path.abspath(args.script), root))
+    # The scratch copy must win over this file's own folder when the bot imports its shared modules.
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != here]
+    sys.path.insert(0, bot_dir)
+
+    import discord
+
+    driver = _LoopThread()
+    fake = FakeDiscord(
+        latency=args.latency,
+        channel_limit=args.channel_limit,
+        channel_window=args.channel_window,
+        random_429=args.random_429,
+        retry_after=args.retry_after,
+    )
+    port = driver.submit(fake.start()).result(timeout=10)
+    discord.http.Route.BASE = f"http://127.0.0.1:{port}/api/v10"
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(f"ws://127.0.0.1:{port}/gateway")
+    try:
+        module = _import_bot(script)
+        report = {"bot": os.path.relpath(script, bot_dir), "workload": args.workload}
+        report.update(asyncio.run(_run(module, fake, driver, _WORKLOADS[args.workload], args)))
+    finally:
+        driver.submit(fake.stop()).result(timeout=10)
+        driver.stop()
+        codec = getattr(sys.modules.get("main2"), "_codec", None)
+        if codec is not None:
+            codec.shutdown()
+        if args.keep_workdir:
+            print(f"Scratch copy kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report.get("timeouts") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
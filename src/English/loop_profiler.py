@@ -0,0 +1,190 @@
+# On-demand sampling profiler and stalled-loop watchdog for the running bots; output is collapsed stacks for flamegraphs.
+import asyncio
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from typing import Counter, Dict, List, Optional, Tuple
+
+
+def _thread_names() -> Dict[int, str]:
+    return {t.ident: t.name for t in threading.enumerate() if t.ident is not None}
+
+
+def _collapse(frame, root: str) -> str:
+    # Root first, then outermost to innermost call, in the "a;b;c" form flamegraph.pl and speedscope read.
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class ProfileResult:
+    def __init__(self, path: str, samples: int, seconds: float, stacks: Counter):
+        self.path = path
+        self.samples = samples
+        self.seconds = seconds
+        self.stacks = stacks
+
+    def top_functions(self, n: int = 5, thread: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Innermost functions by share of samples, optionally for one thread only."""
+        leaves: Counter = collections.Counter()
+        for stack, count in self.stacks.items():
+            parts = stack.split(";")
+            if thread is None or parts[0] == thread:
+                leaves[parts[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [(name, count / total) for name, count in leaves.most_common(n)]
+
+
+class SamplingProfiler:
+    """Samples the Python stack of every thread at a fixed interval for a bounded time.
+
+    Sampling happens on the profiler's own thread through sys._current_frames(), so nothing is
+    installed in the event loop or the workers and the bot keeps running while it is profiled.
+    The event-loop thread is reported as "loop"; processes (the codec pool) are not covered. Only
+    one profile runs at a time.
+    """
+
+    def __init__(self, out_dir: str, interval: float = 0.01, max_seconds: float = 60.0):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.loop_thread_id: Optional[int] = None
+        self._busy = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._busy.locked()
+
+    def run(self, seconds: float) -> Optional[ProfileResult]:
+        """Profile for `seconds` and write the collapsed stacks; blocks, and returns None if a profile is already running."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return self._run(min(max(seconds, self.interval), self.max_seconds))
+        finally:
+            self._busy.release()
+
+    async def profile(self, seconds: float) -> Optional[ProfileResult]:
+        self.loop_thread_id = threading.get_ident()
+        return await asyncio.to_thread(self.run, seconds)
+
+    def _run(self, seconds: float) -> ProfileResult:
+        me = threading.get_ident()
+        stacks: Counter = collections.Counter()
+        names = _thread_names()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        next_at = started
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names = _thread_names()
+                root = "loop" if ident == self.loop_thread_id else names.get(ident, f"thread-{ident}")
+                stacks[_collapse(frame, root)] += 1
+            samples += 1
+            # Fixed schedule: a late sample does not push every later one back.
+            next_at = max(next_at + self.interval, now)
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_path, path)
+        return ProfileResult(path, samples, time.monotonic() - started, stacks)
+
+    def install_signal(self, seconds: float = 10.0, signum: Optional[int] = getattr(signal, "SIGUSR1", None)) -> bool:
+        """Run a profile in the background when the process receives `signum` (SIGUSR1 by default, where it exists)."""
+        if signum is None:
+            return False
+        # Handlers run on the main thread, which is also the loop thread under bot.run().
+        self.loop_thread_id = threading.get_ident()
+
+        def run_and_report():
+            result = self.run(seconds)
+            if result is None:
+                print("Profile already running.")
+            else:
+                print(f"Profile written to {result.path} ({result.samples} samples)")
+
+        signal.signal(signum, lambda *_: threading.Thread(target=run_and_report, name="profiler", daemon=True).start())
+        return True
+
+
+class LoopWatchdog:
+    """Logs the event-loop thread's stack while a single callback keeps the loop busy past `threshold`.
+
+    A task on the loop bumps a heartbeat every `tick`; a watchdog thread checks it. When the
+    heartbeat is late, the stack of the loop thread is captured mid-stall (so it shows the code
+    that is actually blocking, coroutine frames included) and logged along with the task running
+    at that moment. A second line with the total stall time follows when the loop recovers.
+    """
+
+    def __init__(self, threshold: float = 0.5, tick: float = 0.05):
+        self.threshold = threshold
+        self.tick = tick
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.tick)
+
+    def start(self) -> None:
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._thread = None
+
+    def _watch(self) -> None:
+        stalled_since: Optional[float] = None
+        while not self._stopped.wait(self.tick):
+            beat = self._beat
+            late = time.monotonic() - beat
+            if late < self.threshold + self.tick:
+                if stalled_since is not None:
+                    print(f"Event loop stall ended after {beat - stalled_since:.3f}s")
+                    stalled_since = None
+                continue
+            if stalled_since == beat:
+                continue  # this stall was already reported
+            stalled_since = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            task = asyncio.current_task(self._loop)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "  (no frame)\n"
+            print(f"Event loop blocked for {late:.3f}s so far; running {task!r}\n{stack}", end="")
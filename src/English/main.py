@@ -1,33 +1,103 @@
 import os
 import asyncio
-import random
-import csv
+import time
 from datetime import datetime, timezone
-from typing import Optional, Dict, Tuple, Set
+from typing import AsyncIterator, Optional, Dict, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-import cv2
+
+from ascii_render import AsciiRenderer
+from attachment_cache import AttachmentCache, respond_with_image
+from command_sync import sync_if_changed
+from badapple_engine import BadappleEngine, BadappleSession
+from badapple_playback import EditPacer
+from loop_profiler import LoopWatchdog, SamplingProfiler
+from metrics import Metrics, to_thread
+from outbound import BULK, MAX_RATELIMIT_TIMEOUT, OutboundScheduler
+from quote_db import SqliteQuoteStore
+from quote_journal import QuoteJournal
+from quote_polls import QuotePolls
+from quote_store import QuoteStore
+import startup_profile
+from tilley_index import ImageIndex
 
 _BASE_DIR = os.path.dirname(__file__)
 _TOKEN_PATH = os.path.join(_BASE_DIR, "token.txt")
 _QUOTES_CSV_PATH = os.path.join(_BASE_DIR, "quotes.csv")
+# Created by `python quote_db.py quotes.csv quotes.sqlite3`; when present it replaces the CSV.
+_QUOTES_DB_PATH = os.path.join(_BASE_DIR, "quotes.sqlite3")
 _TILLEY_DIR = os.path.join(_BASE_DIR, "tilley")
 _BADAPPLE_PATH = os.path.join(_BASE_DIR, "badapple.mp4")
+_CACHE_DIR = os.path.join(_BASE_DIR, "cache")
 
 _BADAPPLE_ASCII_CHARS = " .:-=+*#%@"
 _BADAPPLE_WIDTH = 49
 _BADAPPLE_HEIGHT = 20
-_BADAPPLE_FPS = 30
-_BADAPPLE_BUFFER_SECONDS = 5
+_BADAPPLE_FPS = 30  # fallback when the video does not report its own rate
 _BADAPPLE_SEND_INTERVAL = 5.0  # seconds between messages
-_BADAPPLE_MAX_QUEUE = _BADAPPLE_FPS * _BADAPPLE_BUFFER_SECONDS
+_BADAPPLE_EDIT_TICK = 0.25  # frame-selection granularity when animating by edits
+_BADAPPLE_EDIT_MIN_INTERVAL = 1.0  # fastest edit pace; backs off from here on rate limits
+_BADAPPLE_MAX_SESSIONS = 8  # channels allowed to play at the same time
+_BADAPPLE_DECODE_WORKERS = 2  # shared decode threads, only used when the frame cache is unavailable
+
+# Metrics endpoint (http://127.0.0.1:<port>/metrics) and periodic log summary; 0 turns either off.
+_METRICS_PORT = int(os.environ.get("BOT_METRICS_PORT") or 0)
+_METRICS_LOG_INTERVAL = float(os.environ.get("BOT_METRICS_LOG_INTERVAL") or 0)
+# Loop stalls longer than this are logged with the blocking stack; 0 turns the watchdog off.
+_SLOW_CALLBACK_THRESHOLD = float(os.environ.get("BOT_SLOW_CALLBACK_MS") or 500) / 1000
+_PROFILE_MAX_SECONDS = 60
+
+
+class _Bot(commands.Bot):
+    async def setup_hook(self) -> None:
+        if isinstance(_quote_store, SqliteQuoteStore):
+            # Schema upgrades can rebuild the search index over every row, so keep them off the loop.
+            await to_thread(_quote_store.prepare)
+        # Re-attach the poll buttons so polls posted before a restart keep working.
+        _quote_polls.attach(self)
+        await _metrics.start(_METRICS_PORT, _METRICS_LOG_INTERVAL)
+        _watchdog.start()
+
+    async def close(self) -> None:
+        # Poll results and quote rows are written behind the interaction replies; flush them before disconnecting.
+        await _quote_polls.close()
+        await _quote_journal.drain()
+        await _metrics.stop()
+        _watchdog.stop()
+        _badapple_engine.shutdown()
+        await super().close()
+
 
-TOKEN: Optional[str] = None
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
-_badapple_tasks: Dict[int, Tuple[asyncio.Event, asyncio.Task, asyncio.Task]] = {}
+bot = _Bot(command_prefix="!", intents=intents, max_ratelimit_timeout=MAX_RATELIMIT_TIMEOUT)
+_outbound = OutboundScheduler()
+_badapple_tasks: Dict[int, Tuple[BadappleSession, asyncio.Task]] = {}
+_quote_store = (
+    SqliteQuoteStore(_QUOTES_DB_PATH) if os.path.exists(_QUOTES_DB_PATH) else QuoteStore(_QUOTES_CSV_PATH)
+)
+_quote_journal = QuoteJournal(_quote_store)
+_quote_polls = QuotePolls(_outbound, _quote_journal, os.path.join(_CACHE_DIR, "quote_polls.json"))
+_tilley_index = ImageIndex(_TILLEY_DIR)
+_tilley_uploads = AttachmentCache(os.path.join(_CACHE_DIR, "tilley_uploads.json"))
+_badapple_engine = BadappleEngine(
+    _BADAPPLE_PATH,
+    AsciiRenderer(_BADAPPLE_WIDTH, _BADAPPLE_HEIGHT, _BADAPPLE_ASCII_CHARS),
+    _CACHE_DIR,
+    max_sessions=_BADAPPLE_MAX_SESSIONS,
+    max_workers=_BADAPPLE_DECODE_WORKERS,
+    fallback_fps=_BADAPPLE_FPS,
+)
+_badapple_warmup: Optional[asyncio.Task] = None
+_profiler = SamplingProfiler(os.path.join(_CACHE_DIR, "profiles"), max_seconds=_PROFILE_MAX_SECONDS)
+_watchdog = LoopWatchdog(_SLOW_CALLBACK_THRESHOLD)
+_metrics = Metrics()
+_metrics.instrument(bot, _outbound)
+_metrics.poll("badapple_sessions", lambda: _badapple_engine.active_sessions, "Channels playing Bad Apple.")
+_metrics.poll(
+    "badapple_decode_queue", lambda: _badapple_engine.pending_decodes, "Bad Apple frames queued for live decoding."
+)
 _synced_once = False
 
 
@@ -43,197 +113,209 @@ def _load_token() -> str:
     return token
 
 
-TOKEN = _load_token()
-
-
 @bot.event
 async def on_ready():
-    global _synced_once
+    global _synced_once, _badapple_warmup
     if _synced_once:
         return
+    if _badapple_warmup is None:
+        # Build the frame file in the background so the first /badapple does not pay for it.
+        _badapple_warmup = asyncio.create_task(_badapple_engine.prepare())
     try:
-        synced = await bot.tree.sync()
-        print(f"Global commands synced: {len(synced)}")
+        # Skipped when the command schema matches the last successful sync (also across restarts).
+        synced = await sync_if_changed(bot.tree, os.path.join(_CACHE_DIR, "command_sync.json"))
+        print("Global commands unchanged, sync skipped" if synced is None else f"Global commands synced: {synced}")
         print(f"Logged in as {bot.user} (id={bot.user.id})")
+        if startup_profile.enabled():
+            print(startup_profile.ready_report())
         _synced_once = True
     except Exception as e:  # noqa: BLE001
         print(f"Sync failed: {e}")
 
 @bot.tree.command(name="peap", description="Peaper")
 async def peap(interaction: discord.Interaction):
-    await interaction.response.send_message("peap")
+    await _outbound.respond(interaction, "peap")
 
 
 @bot.tree.command(name="tilley", description="Send a random Tilley image")
 async def tilley(interaction: discord.Interaction):
-    if not os.path.isdir(_TILLEY_DIR):
-        await interaction.response.send_message("No Tilley folder found.", ephemeral=True)
+    # Usually answered from memory; only a changed folder costs a rescan.
+    choice = await to_thread(_tilley_index.pick)
+    if not _tilley_index.exists:
+        await _outbound.respond(interaction, "No Tilley folder found.", ephemeral=True)
         return
 
-    files = [
-        os.path.join(_TILLEY_DIR, f)
-        for f in os.listdir(_TILLEY_DIR)
-        if os.path.isfile(os.path.join(_TILLEY_DIR, f))
-        and f.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp"))
-    ]
-
-    if not files:
-        await interaction.response.send_message("No Tilley images available.", ephemeral=True)
+    if choice is None:
+        await _outbound.respond(interaction, "No Tilley images available.", ephemeral=True)
         return
 
-    choice = random.choice(files)
-    await interaction.response.send_message(file=discord.File(choice))
+    # Images posted before are sent as an embed of their CDN URL instead of being uploaded again.
+    await respond_with_image(_outbound, interaction, _tilley_uploads, choice)
 
 
-def _frame_to_ascii(frame, width: int = _BADAPPLE_WIDTH, height: int = _BADAPPLE_HEIGHT) -> str:
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    if gray.size == 0:
-        return ""
-
-    resized = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
-    scale = (len(_BADAPPLE_ASCII_CHARS) - 1) / 255
-    lines = [
-        "".join(_BADAPPLE_ASCII_CHARS[int(px * scale)] for px in row)
-        for row in resized
-    ]
-    return "\n".join(lines)
-
-
-async def _badapple_producer(queue: asyncio.Queue, stop_event: asyncio.Event):
-    cap = cv2.VideoCapture(_BADAPPLE_PATH)
+async def _badapple_sender(
+    msg: discord.Message,
+    frames: AsyncIterator[Tuple[int, str]],
+    session: BadappleSession,
+):
+    channel = msg.channel
+    clock = session.clock
     try:
-        while not stop_event.is_set():
-            if queue.qsize() >= _BADAPPLE_MAX_QUEUE:
-                await asyncio.sleep(0.05)
-                continue
-
-            ok, frame = await asyncio.to_thread(cap.read)
-            if not ok:
+        async for tick, frame in frames:
+            if session.stop_event.is_set():
                 break
-
-            ascii_frame = await asyncio.to_thread(_frame_to_ascii, frame)
-            await queue.put(ascii_frame)
+            # Wait for this frame's slot; a frame that is already late goes out right away.
+            delay = clock.tick_time(tick) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                # Bulk priority: interaction replies in this channel go out ahead of queued frames.
+                await _outbound.send(channel, f"```{frame}```", priority=BULK)
+            except Exception:
+                break
+            _metrics.inc("badapple_frames_total", help_text="Bad Apple frames sent or edited in.")
     finally:
-        cap.release()
-        await queue.put(None)
+        session.close()
 
 
-async def _badapple_sender(msg: discord.Message, queue: asyncio.Queue, stop_event: asyncio.Event):
-    channel = msg.channel
-    while not stop_event.is_set():
-        frame = await queue.get()
-        if frame is None:
-            break
-        try:
-            await channel.send(f"```{frame}```")
-        except discord.HTTPException as e:
-            if e.status == 429 and hasattr(e, "retry_after"):
-                await asyncio.sleep(getattr(e, "retry_after", 1))
-                try:
-                    await channel.send(f"```{frame}```")
-                except Exception:
+async def _badapple_editor(
+    msg: discord.Message,
+    frames: AsyncIterator[Tuple[int, str]],
+    session: BadappleSession,
+):
+    # Edit via the channel rather than the followup webhook, whose token expires after 15 minutes.
+    target = msg.channel.get_partial_message(msg.id)
+    pacer = EditPacer(_BADAPPLE_EDIT_MIN_INTERVAL)
+    # Frames are only pulled once the previous edit finished, so anything that came due meanwhile is dropped.
+    try:
+        async for tick, frame in frames:
+            if session.stop_event.is_set():
+                break
+            started = time.monotonic()
+            try:
+                await _outbound.edit(
+                    target, content=f"```{frame}```", priority=BULK, coalesce_key=("badapple", msg.id)
+                )
+            except discord.RateLimited as e:
+                pacer.on_rate_limited(e.retry_after)
+            except discord.HTTPException as e:
+                if e.status != 429:
                     break
-            else:
+                pacer.on_rate_limited(getattr(e, "retry_after", 1))
+            except Exception:
                 break
-        except Exception:
-            break
-
-        await asyncio.sleep(_BADAPPLE_SEND_INTERVAL)
-    stop_event.set()
+            else:
+                pacer.on_success(time.monotonic() - started)
+                _metrics.inc("badapple_frames_total", help_text="Bad Apple frames sent or edited in.")
+            delay = started + pacer.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    finally:
+        session.close()
 
 
 @bot.tree.command(name="badapple", description="Play Bad Apple!!")
-async def badapple(interaction: discord.Interaction):
+@app_commands.describe(edit="Animate by editing one message instead of posting a new one per frame")
+async def badapple(interaction: discord.Interaction, edit: Optional[bool] = False):
     channel = interaction.channel
     if channel is None:
-        await interaction.response.send_message("No channel to send Bad Apple to.", ephemeral=True)
+        await _outbound.respond(interaction, "No channel to send Bad Apple to.", ephemeral=True)
         return
 
     existing = _badapple_tasks.get(channel.id)
     if existing:
-        stop_event, prod_task, cons_task = existing
-        if not stop_event.is_set():
-            await interaction.response.send_message(
-                "Bad Apple is already playing in this channel", ephemeral=True
+        session, send_task = existing
+        if not session.stop_event.is_set():
+            await _outbound.respond(
+                interaction, "Bad Apple is already playing in this channel", ephemeral=True
             )
             return
 
-    await interaction.response.defer(thinking=True)
-    queue: asyncio.Queue = asyncio.Queue(maxsize=_BADAPPLE_MAX_QUEUE)
-    stop_event = asyncio.Event()
-    producer = asyncio.create_task(_badapple_producer(queue, stop_event))
-
-    first_frame = await queue.get()
-    if first_frame is None:
-        stop_event.set()
-        producer.cancel()
-        await interaction.followup.send("Could not load Bad Apple frames.", ephemeral=True)
+    await _outbound.defer(interaction, thinking=True)
+    # Sessions are just cursors over the engine's shared frames.
+    interval = _BADAPPLE_EDIT_TICK if edit else _BADAPPLE_SEND_INTERVAL
+    session = await _badapple_engine.open_session(channel.id, interval)
+    if session is None:
+        if _badapple_engine.session(channel.id) is not None:
+            message = "Bad Apple is already playing in this channel"
+        else:
+            message = "Too many Bad Apple playbacks are running right now, try again later."
+        await _outbound.followup(interaction, message, ephemeral=True)
         return
 
-    playback_message = await interaction.followup.send(f"```{first_frame}```")
-    _badapple_tasks[channel.id] = (
-        stop_event,
-        producer,
-        asyncio.create_task(_badapple_sender(playback_message, queue, stop_event)),
-    )
+    started = False
+    try:
+        frames = session.frames()
+        first = await anext(frames, None)
+        if first is None:
+            await _outbound.followup(interaction, "Could not load Bad Apple frames.", ephemeral=True)
+            return
+
+        playback_message = await _outbound.followup(interaction, f"```{first[1]}```")
+        runner = _badapple_editor if edit else _badapple_sender
+        _badapple_tasks[channel.id] = (
+            session,
+            asyncio.create_task(runner(playback_message, frames, session)),
+        )
+        started = True
+    finally:
+        # Until the runner task owns the session, release it here (also when this command is cancelled).
+        if not started:
+            session.close()
 
 
 @bot.tree.command(name="stopapple", description="Stop Bad Apple printing")
 async def stopapple(interaction: discord.Interaction):
     channel = interaction.channel
     if channel is None:
-        await interaction.response.send_message("No channel to stop.", ephemeral=True)
+        await _outbound.respond(interaction, "No channel to stop.", ephemeral=True)
         return
 
     existing = _badapple_tasks.get(channel.id)
     if not existing:
-        await interaction.response.send_message(
-            "Bad Apple isn't running in this channel", ephemeral=True
+        await _outbound.respond(
+            interaction, "Bad Apple isn't running in this channel", ephemeral=True
         )
         return
 
-    stop_event, prod_task, send_task = existing
-    stop_event.set()
-    for task in (prod_task, send_task):
-        if task and not task.done():
-            task.cancel()
+    session, send_task = existing
+    session.close()
+    if not send_task.done():
+        send_task.cancel()
     _badapple_tasks.pop(channel.id, None)
-    await interaction.response.send_message("Bad Apple stopped in this channel", ephemeral=True)
+    await _outbound.respond(interaction, "Bad Apple stopped in this channel", ephemeral=True)
 
 
-@bot.tree.command(name="quote", description="Send a random text quote.")
-@app_commands.describe(user="User to get the quote from (optional)", include_id="Include snowflake id")
-async def quote(
-    interaction: discord.Interaction,
-    user: Optional[discord.User] = None,
-    include_id: Optional[bool] = False,
-):
-    rows = []
-    with open(_QUOTES_CSV_PATH, "r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        for r in reader:
-            if len(r) < 4:
-                continue
-            quote_text, author_name, unix_ts_str, snowflake = (
-                r[0].strip(),
-                r[1].strip(),
-                r[2].strip(),
-                r[3].strip(),
-            )
-            if not quote_text:
-                continue
-            rows.append((quote_text, author_name, unix_ts_str, snowflake))
-
-    if user:
-        target = _display_name(user)
-        rows = [r for r in rows if r[1] == target]
+@bot.tree.command(name="profile", description="Sample what the bot is doing and upload a flamegraph file")
+@app_commands.describe(seconds="How long to sample")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+async def profile(interaction: discord.Interaction, seconds: app_commands.Range[int, 1, _PROFILE_MAX_SECONDS] = 10):
+    # default_permissions only hides the command; server settings can re-grant it, so check again here.
+    if not interaction.permissions.administrator:
+        await _outbound.respond(interaction, "Only administrators can profile the bot.", ephemeral=True)
+        return
+    if _profiler.running:
+        await _outbound.respond(interaction, "A profile is already running.", ephemeral=True)
+        return
 
-    # Worst case scenario the csv/sql or whatever we're using fucked itself over
-    if not rows:
-        await interaction.response.send_message("The program went up in flames.", ephemeral=True)
+    await _outbound.defer(interaction, ephemeral=True, thinking=True)
+    result = await _profiler.profile(seconds)
+    if result is None:
+        await _outbound.followup(interaction, "A profile is already running.", ephemeral=True)
         return
+    lines = [f"{result.samples} samples over {result.seconds:.1f}s. Busiest on the event loop:"]
+    lines += [f"`{share:6.1%}` {name}" for name, share in result.top_functions(5, thread="loop")]
+    await _outbound.followup(
+        interaction, "\n".join(lines)[:2000], file_path=result.path, ephemeral=True
+    )
+
+
+_QUOTE_SEARCH_RESULTS = 5
+
 
-    quote_text, author_name, unix_ts_str, snowflake = random.choice(rows)
+def _format_quote(picked, include_id: bool) -> str:
+    quote_text, author_name, unix_ts_str, snowflake = picked
 
     try:
         unix_ts = int(float(unix_ts_str))
@@ -245,104 +327,58 @@ async def quote(
     msg = f"{quote_text} \\- {author_name} said on {date_str}"
     if include_id:
         msg += f" (snowflake: {snowflake})"
+    return msg
+
+
+@bot.tree.command(name="quote", description="Send a random text quote.")
+@app_commands.describe(
+    user="User to get the quote from (optional)",
+    include_id="Include snowflake id",
+    search="Words to look for instead of picking at random (word starts match too)",
+)
+async def quote(
+    interaction: discord.Interaction,
+    user: Optional[discord.User] = None,
+    include_id: Optional[bool] = False,
+    search: Optional[str] = None,
+):
+    target = _display_name(user) if user else None
+    if search:
+        found = await to_thread(_quote_store.search, search, _QUOTE_SEARCH_RESULTS, target)
+        if not found:
+            await _outbound.respond(interaction, f"No quotes match \"{search}\".", ephemeral=True)
+            return
+        lines = [_format_quote(q, include_id) for q in found]
+        await _outbound.respond(interaction, "\n".join(lines)[:2000])
+        return
+
+    # Either backend can block (first CSV parse, SQLite I/O), so it never runs on the event loop.
+    picked = await to_thread(_quote_store.random_quote, target, user.id if user else None)
+
+    # Worst case scenario the csv/sql or whatever we're using fucked itself over
+    if picked is None:
+        await _outbound.respond(interaction, "The program went up in flames.", ephemeral=True)
+        return
 
-    await interaction.response.send_message(msg)
+    await _outbound.respond(interaction, _format_quote(picked, include_id))
 
 
 @bot.tree.context_menu(name="Add a quote")
 async def add_quote(interaction: discord.Interaction, message: discord.Message):
     author_name = _display_name(message.author)
     created_ts = message.created_at.replace(tzinfo=timezone.utc).timestamp()
-    with open(_QUOTES_CSV_PATH, "a", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([message.content.strip(), author_name, created_ts, message.id])
+    _quote_journal.submit(message.content.strip(), author_name, created_ts, message.id, message.author.id)
 
-    await interaction.response.send_message("Quote noted", ephemeral=True)
+    await _outbound.respond(interaction, "Quote noted", ephemeral=True)
 
 
 @bot.tree.command(name="add_quote_poll")
 async def add_quote_poll(interaction: discord.Interaction, message: str, author: discord.User):
-    quote_text = message.strip()
-    author_name = _display_name(author)
-    needed = 3
-    poll_text = (
-        f'Did the quote actually happen irl?\n"{quote_text}" \\- {author_name}\nNeeds {needed} 👍 votes to confirm'
-    )
-
-    quote_embed = discord.Embed(
-        title="Quote Poll",
-        description=quote_text,
-        color=discord.Color.blurple(),
-    )
-
-    class PollView(discord.ui.View):
-        def __init__(self, base_content: str):
-            super().__init__(timeout=None)
-            self.base_content = base_content
-            self.yes = 0
-            self.no = 0
-            self.completed = False
-
-        def _status(self) -> str:
-            return f"👍 Yes: {self.yes}\n👎 No: {self.no}"
-
-        def _embed(self, extra: Optional[str] = None) -> discord.Embed:
-            description = f"{self.base_content}\n\n{self._status()}"
-            if extra:
-                description += f"\n\n{extra}"
-            return discord.Embed(description=description, color=discord.Color.blurple())
-
-        async def _edit(self, interaction: discord.Interaction, extra: Optional[str] = None) -> None:
-            embed = self._embed(extra)
-            try:
-                if interaction.response.is_done():
-                    await interaction.edit_original_response(embed=embed, view=self)
-                else:
-                    await interaction.response.edit_message(embed=embed, view=self)
-            except discord.NotFound:
-                return
-
-        async def _maybe_complete(self, interaction: discord.Interaction) -> bool:
-            if self.completed:
-                return True
-            if self.yes >= needed:
-                self.completed = True
-                for child in self.children:
-                    child.disabled = True
-                with open(_QUOTES_CSV_PATH, "a", encoding="utf-8", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(
-                        [
-                            quote_text,
-                            author_name,
-                            datetime.now(tz=timezone.utc).timestamp(),
-                            interaction.message.id if interaction.message else 0,
-                        ]
-                    )
-                await self._edit(interaction, "Quote added successfully, 👍 threshold reached")
-                return True
-            return False
-
-        @discord.ui.button(label="👍 Yes", style=discord.ButtonStyle.green)
-        async def yes_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.yes += 1
-            if await self._maybe_complete(interaction):
-                return
-            await self._edit(interaction)
-
-        @discord.ui.button(label="👎 No", style=discord.ButtonStyle.red)
-        async def no_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.no += 1
-            await self._edit(interaction)
-
-    view = PollView(poll_text)
-
-    await interaction.response.send_message(
-        embed=view._embed(),
-        view=view,
-        ephemeral=False,
-    )
+    await _quote_polls.start(interaction, message.strip(), author, _display_name(author), needed=3)
 
 
 if __name__ == "__main__":
-    bot.run(TOKEN)
\ No newline at end of file
+    # `kill -USR1 <pid>` writes a 10 second profile to cache/profiles without going through Discord.
+    _profiler.install_signal()
+    # Read only when actually starting, so importing this module (tools, startup_profile.py) needs no token.
+    bot.run(_load_token())
\ No newline at end of file
@@ -0,0 +1,397 @@
+# Per-command latency metrics for both bots: log-linear histograms, a local Prometheus endpoint and a log summary.
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+from outbound import BULK, INTERACTIVE, OutboundScheduler
+
+# Values are kept in microseconds, in 16 linear sub-buckets per power of two (within ~6%).
+_SUB_BUCKETS = 16
+_SHIFT_BASE = _SUB_BUCKETS.bit_length()  # bits kept below the leading one
+_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _bucket(ticks: int) -> int:
+    if ticks < 2 * _SUB_BUCKETS:
+        return ticks
+    shift = ticks.bit_length() - _SHIFT_BASE
+    return shift * _SUB_BUCKETS + (ticks >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    if index < 2 * _SUB_BUCKETS:
+        return index + 1
+    shift = index // _SUB_BUCKETS - 1
+    return (index - shift * _SUB_BUCKETS + 1) << shift
+
+
+class Histogram:
+    """HDR-style histogram of durations in seconds.
+
+    Memory is a count per occupied bucket, whatever the number of samples, and percentiles are
+    reported as the upper edge of their bucket, so they never understate a latency.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        index = _bucket(int(seconds * 1_000_000))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.max, _bucket_upper(index) / 1_000_000)
+        return self.max
+
+    def copy(self) -> "Histogram":
+        other = Histogram()
+        other.counts = dict(self.counts)
+        other.count, other.total, other.max = self.count, self.total, self.max
+        return other
+
+    def since(self, earlier: "Histogram") -> "Histogram":
+        """Samples recorded after `earlier` was copied; max is the top occupied bucket's edge."""
+        delta = Histogram()
+        for index, n in self.counts.items():
+            n -= earlier.counts.get(index, 0)
+            if n:
+                delta.counts[index] = n
+        delta.count = self.count - earlier.count
+        delta.total = self.total - earlier.total
+        delta.max = min(self.max, _bucket_upper(max(delta.counts)) / 1_000_000) if delta.counts else 0.0
+        return delta
+
+
+class _Invocation:
+    """Timing of one command interaction, carried in interaction.extras and a context variable."""
+
+    __slots__ = ("started", "responded", "executor_wait")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.responded: Optional[float] = None
+        self.executor_wait = 0.0
+
+
+_current: contextvars.ContextVar[Optional[_Invocation]] = contextvars.ContextVar("bot_command", default=None)
+
+
+def note_executor_wait(seconds: float) -> None:
+    """Charge time spent queued for a thread or process pool to the command being handled, if any."""
+    invocation = _current.get()
+    if invocation is not None:
+        invocation.executor_wait += seconds
+
+
+async def to_thread(fn, *args, **kwargs):
+    """asyncio.to_thread that also records how long the call waited for a free thread."""
+    submitted = time.perf_counter()
+
+    def call():
+        note_executor_wait(time.perf_counter() - submitted)
+        return fn(*args, **kwargs)
+
+    # to_thread copies the context, so the wait is charged to the caller's command.
+    return await asyncio.to_thread(call)
+
+
+def _command_name(interaction: discord.Interaction) -> str:
+    command = interaction.command
+    return command.qualified_name if command is not None else "unknown"
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = labels + ((extra,) if extra else ())
+    if not items:
+        return ""
+    escaped = (
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in items
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}ms"
+
+
+# Warnings discord.py logs for every 429 it gets, whether it then retries or raises.
+_RATE_LIMIT_LOGS = {
+    "discord.http": "We are being rate limited.",
+    "discord.webhook.async_": "Webhook ID %s is rate limited.",
+}
+
+
+class _RateLimitCounter(logging.Filter):
+    """Counts 429s from discord.py's log records, including those it sleeps through and retries itself.
+
+    Records are only created while the discord loggers are enabled for WARNING, as they are with the
+    logging setup `Client.run` installs.
+    """
+
+    def __init__(self, metrics: "Metrics"):
+        super().__init__()
+        self.metrics = metrics
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        prefix = _RATE_LIMIT_LOGS.get(record.name)
+        if prefix is not None and isinstance(record.msg, str) and record.msg.startswith(prefix):
+            self.metrics.inc("discord_rate_limited_total", help_text="429 responses from Discord.")
+        return True
+
+
+class Metrics:
+    """Histograms, counters and polled values for one bot process.
+
+    `instrument` hooks the command tree, so every slash command and context menu is timed without
+    touching the handlers: time to first response (the first reply or defer going through the
+    outbound scheduler), total handler time by outcome, and time spent queued for executors.
+    `start` adds an event-loop lag probe, the optional HTTP endpoint and the optional log summary.
+    """
+
+    def __init__(self, prefix: str = "bot"):
+        self.prefix = prefix
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._histograms: Dict[Tuple[str, _Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, _Labels], float] = {}
+        self._polled: Dict[Tuple[str, _Labels], Callable[[], float]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._runner = None
+
+    def _key(self, name: str, kind: str, help_text: str, labels: Dict[str, str]) -> Tuple[str, _Labels]:
+        name = f"{self.prefix}_{name}"
+        self._help.setdefault(name, (kind, help_text))
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name: str, seconds: float, help_text: str = "", **labels) -> None:
+        key = self._key(name, "summary", help_text, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.record(seconds)
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels) -> None:
+        key = self._key(name, "counter", help_text, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def poll(self, name: str, fn: Callable[[], float], help_text: str = "", kind: str = "gauge", **labels) -> None:
+        """Report fn() at scrape time; kind="counter" for totals kept elsewhere (e.g. the outbound 429 count)."""
+        self._polled[self._key(name, kind, help_text, labels)] = fn
+
+    # Command instrumentation.
+
+    def instrument(self, bot: discord.Client, outbound: OutboundScheduler) -> None:
+        tree: app_commands.CommandTree = bot.tree
+        check = tree.interaction_check
+        previous_on_error = tree.on_error
+
+        async def interaction_check(interaction: discord.Interaction) -> bool:
+            # Runs in the task that then invokes the command, so the context variable reaches the handler.
+            invocation = _Invocation(time.perf_counter())
+            interaction.extras["metrics"] = invocation
+            _current.set(invocation)
+            return await check(interaction)
+
+        async def on_error(interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+            self._finish(interaction, "error")
+            await previous_on_error(interaction, error)
+
+        async def on_app_command_completion(interaction: discord.Interaction, command) -> None:
+            self._finish(interaction, "ok")
+
+        tree.interaction_check = interaction_check
+        tree.error(on_error)
+        bot.add_listener(on_app_command_completion, "on_app_command_completion")
+        outbound.on_response = self._responded
+        # discord.py retries most 429s inside its HTTP and webhook clients, so only their logs see all of them.
+        counter = _RateLimitCounter(self)
+        for logger in _RATE_LIMIT_LOGS:
+            logging.getLogger(logger).addFilter(counter)
+        self.inc("discord_rate_limited_total", 0, "429 responses from Discord.")
+        self.poll(
+            "outbound_rate_limited_total",
+            lambda: outbound.rate_limited,
+            "Rate limits that reached the outbound scheduler.",
+            kind="counter",
+        )
+        for label, priority in (("interactive", INTERACTIVE), ("bulk", BULK)):
+            self.poll(
+                "outbound_queued_requests",
+                lambda p=priority: outbound.queued(p),
+                "Requests waiting in the outbound scheduler.",
+                priority=label,
+            )
+
+    def _responded(self, interaction: discord.Interaction) -> None:
+        invocation = interaction.extras.get("metrics")
+        if invocation is None or invocation.responded is not None:
+            return
+        invocation.responded = time.perf_counter()
+        self.observe(
+            "command_first_response_seconds",
+            invocation.responded - invocation.started,
+            "Time from receiving a command to its first reply or defer.",
+            command=_command_name(interaction),
+        )
+
+    def _finish(self, interaction: discord.Interaction, outcome: str) -> None:
+        invocation = interaction.extras.pop("metrics", None)
+        if invocation is None:
+            return
+        command = _command_name(interaction)
+        self.observe(
+            "command_duration_seconds",
+            time.perf_counter() - invocation.started,
+            "Total command handler time.",
+            command=command,
+            outcome=outcome,
+        )
+        self.observe(
+            "command_executor_wait_seconds",
+            invocation.executor_wait,
+            "Time a command's blocking work spent queued for a thread or process pool.",
+            command=command,
+        )
+
+    # Background probes and exporters.
+
+    async def _watch_loop_lag(self, interval: float) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.observe(
+                "event_loop_lag_seconds",
+                time.perf_counter() - started - interval,
+                "How late a sleep on the event loop woke up.",
+            )
+
+    async def _log_summaries(self, interval: float) -> None:
+        earlier = {key: h.copy() for key, h in self._histograms.items()}
+        earlier_counts = self._snapshot_counts()
+        while True:
+            await asyncio.sleep(interval)
+            current = {key: h.copy() for key, h in self._histograms.items()}
+            counts = self._snapshot_counts()
+            for line in self.summary(current, earlier, counts, earlier_counts, interval):
+                print(line)
+            earlier, earlier_counts = current, counts
+
+    def _snapshot_counts(self) -> Dict[Tuple[str, _Labels], float]:
+        counts = dict(self._counters)
+        for key, fn in self._polled.items():
+            if self._help[key[0]][0] == "counter":
+                counts[key] = fn()
+        return counts
+
+    def summary(self, current, earlier, counts, earlier_counts, interval: float) -> List[str]:
+        """Log lines covering what happened between two snapshots."""
+        lines = []
+        by_command: Dict[str, Dict[str, Histogram]] = {}
+        for (name, labels), histogram in current.items():
+            delta = histogram.since(earlier.get((name, labels), Histogram()))
+            if not delta.count:
+                continue
+            label_map = dict(labels)
+            short = name[len(self.prefix) + 1:]
+            if "command" in label_map:
+                slot = short if "outcome" not in label_map else f"{short}:{label_map['outcome']}"
+                by_command.setdefault(label_map["command"], {})[slot] = delta
+            elif short == "event_loop_lag_seconds":
+                lines.append(f"[metrics] loop lag p99={_ms(delta.percentile(0.99))} max={_ms(delta.max)}")
+        for command, parts in sorted(by_command.items()):
+            ok = parts.get("command_duration_seconds:ok", Histogram())
+            errors = parts.get("command_duration_seconds:error", Histogram())
+            first = parts.get("command_first_response_seconds", Histogram())
+            wait = parts.get("command_executor_wait_seconds", Histogram())
+            lines.append(
+                f"[metrics] /{command}: {ok.count} ok, {errors.count} failed; "
+                f"first response p50={_ms(first.percentile(0.5))} p99={_ms(first.percentile(0.99))}; "
+                f"total p99={_ms(ok.percentile(0.99))}; executor wait p99={_ms(wait.percentile(0.99))}"
+            )
+        for key, value in sorted(counts.items()):
+            change = value - earlier_counts.get(key, 0)
+            if change:
+                name = key[0][len(self.prefix) + 1:]
+                lines.append(f"[metrics] {name}{_format_labels(key[1])} +{change:g} ({change / interval:.2f}/s)")
+        return lines
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        out: List[str] = []
+        grouped: Dict[str, List[str]] = {}
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            rows = grouped.setdefault(name, [])
+            for q in _QUANTILES:
+                rows.append(f"{name}{_format_labels(labels, ('quantile', str(q)))} {histogram.percentile(q):.6f}")
+            rows.append(f"{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+            rows.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in sorted(self._counters.items()):
+            grouped.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), fn in sorted(self._polled.items(), key=lambda item: item[0]):
+            grouped.setdefault(name, []).append(f"{name}{_format_labels(labels)} {fn():g}")
+        for name in sorted(grouped):
+            kind, help_text = self._help[name]
+            if help_text:
+                out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(grouped[name])
+        return "\n".join(out) + "\n"
+
+    async def _serve(self, host: str, port: int) -> None:
+        # Imported here so bots that never enable the endpoint do not load the web server.
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"Metrics on http://{host}:{port}/metrics")
+
+    async def start(
+        self, port: int = 0, log_interval: float = 0, host: str = "127.0.0.1", lag_interval: float = 0.5
+    ) -> None:
+        """Start the loop-lag probe, plus the endpoint when `port` is set and the log summary when `log_interval` is."""
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._watch_loop_lag(lag_interval)))
+        if log_interval > 0:
+            self._tasks.append(loop.create_task(self._log_summaries(log_interval)))
+        if port:
+            try:
+                await self._serve(host, port)
+            except OSError as e:
+                print(f"Metrics endpoint unavailable: {e}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
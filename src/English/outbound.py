@@ -0,0 +1,324 @@
+# Outbound Discord request scheduler shared by both bots: token buckets per route and globally, priorities, and 429 retries.
+import asyncio
+import heapq
+import io
+import itertools
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import discord
+
+# Lower numbers go first: interaction replies jump ahead of bulk streams such as badapple frames.
+INTERACTIVE = 0
+BULK = 10
+# Pass as max_ratelimit_timeout to the bot: discord.py keeps sleeping through shorter 429s itself, and
+# longer waits raise discord.RateLimited so the scheduler requeues them instead of parking a task.
+# discord.py does not accept anything below 30 seconds.
+MAX_RATELIMIT_TIMEOUT = 30.0
+
+
+class TokenBucket:
+    """Classic token bucket; block() empties it until a server-provided retry_after has passed."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 when it is available now)."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full_in(self, now: float) -> float:
+        """Seconds until the bucket is back at capacity, i.e. safe to forget."""
+        self._refill(now)
+        return max(0.0, self._blocked_until - now) + (self.capacity - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until: float) -> None:
+        self._blocked_until = max(self._blocked_until, until)
+        self.tokens = 0
+        self._updated = self._blocked_until
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "call", "futures", "coalesce_key", "attempts", "not_before")
+
+    def __init__(self, priority: int, seq: int, call: Callable[[], Awaitable[Any]], coalesce_key: Optional[Hashable]):
+        self.priority = priority
+        self.seq = seq
+        self.call = call
+        self.futures: List[asyncio.Future] = []
+        self.coalesce_key = coalesce_key
+        self.attempts = 0
+        self.not_before = 0.0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Route:
+    """Requests that share one Discord rate-limit bucket; they run one at a time, in order."""
+
+    __slots__ = ("bucket", "global_exempt", "jobs", "busy")
+
+    def __init__(self, bucket: Optional[TokenBucket], global_exempt: bool):
+        self.bucket = bucket
+        self.global_exempt = global_exempt
+        self.jobs: List[_Job] = []
+        self.busy = False
+
+
+def _retry_after(e: Exception) -> float:
+    value = getattr(e, "retry_after", None)
+    if value is None:
+        response = getattr(e, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class OutboundScheduler:
+    """Single dispatcher for every outgoing message, edit and interaction reply.
+
+    Channel routes get their own token bucket and all bot-authenticated routes share a global
+    one. Interaction callbacks and followups are exempt from Discord's global limit, so they only
+    queue behind other work for the same interaction. Each queued request carries a priority; a
+    request with a coalesce key replaces a still-queued request with the same key, and a 429 puts
+    the request back with its retry_after plus jitter.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 45.0,
+        channel_rate: float = 1.0,
+        channel_burst: float = 5.0,
+        max_retries: int = 4,
+    ):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.max_retries = max_retries
+        self.rate_limited = 0  # rate limits that reached the scheduler, including retried ones
+        # Called with the interaction once its initial response (reply, defer or component update) succeeded.
+        self.on_response: Optional[Callable[[discord.Interaction], None]] = None
+        self._global = TokenBucket(global_rate, global_rate)
+        self._routes: Dict[Hashable, _Route] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def queued(self, priority: Optional[int] = None) -> int:
+        """Requests waiting to run, optionally only those queued at `priority`."""
+        return sum(
+            len(route.jobs) if priority is None else sum(1 for job in route.jobs if job.priority == priority)
+            for route in self._routes.values()
+        )
+
+    def _route(self, key: Hashable, limited: bool) -> _Route:
+        route = self._routes.get(key)
+        if route is None:
+            bucket = TokenBucket(self.channel_rate, self.channel_burst) if limited else None
+            route = self._routes[key] = _Route(bucket, global_exempt=not limited)
+        return route
+
+    def _kick(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        self._wakeup.set()
+
+    async def submit(
+        self,
+        route_key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        *,
+        priority: int = INTERACTIVE,
+        coalesce_key: Optional[Hashable] = None,
+        limited: bool = True,
+    ) -> Any:
+        """Queue `call` on a route and return its result once it has run."""
+        future = asyncio.get_running_loop().create_future()
+        route = self._route(route_key, limited)
+        job = None
+        if coalesce_key is not None:
+            job = next((j for j in route.jobs if j.coalesce_key == coalesce_key), None)
+        if job is not None:
+            # The newer payload supersedes the queued one; both callers get its result.
+            job.call = call
+        else:
+            job = _Job(priority, next(self._seq), call, coalesce_key)
+            heapq.heappush(route.jobs, job)
+        job.futures.append(future)
+        self._kick()
+        return await future
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            delay: Optional[float] = None
+            ready = []
+            for key, route in list(self._routes.items()):
+                if route.busy:
+                    continue
+                if not route.jobs:
+                    idle_for = 0.0 if route.bucket is None else route.bucket.full_in(now)
+                    if idle_for <= 0:
+                        del self._routes[key]
+                    else:
+                        delay = idle_for if delay is None else min(delay, idle_for)
+                    continue
+                job = route.jobs[0]
+                wait = job.not_before - now
+                if route.bucket is not None:
+                    wait = max(wait, route.bucket.wait_time(now))
+                if wait > 0:
+                    delay = wait if delay is None else min(delay, wait)
+                    continue
+                ready.append((job, route))
+
+            ready.sort(key=lambda item: item[0])
+            global_wait = self._global.wait_time(now)
+            for job, route in ready:
+                if not route.global_exempt and global_wait > 0:
+                    delay = global_wait if delay is None else min(delay, global_wait)
+                    continue
+                heapq.heappop(route.jobs)
+                if route.bucket is not None:
+                    route.bucket.take(now)
+                if not route.global_exempt:
+                    self._global.take(now)
+                    global_wait = self._global.wait_time(now)
+                route.busy = True
+                task = asyncio.get_running_loop().create_task(self._run(route, job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if not self._routes:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, route: _Route, job: _Job) -> None:
+        try:
+            if all(f.done() for f in job.futures):
+                return  # every caller gave up while it was queued
+            try:
+                result = await job.call()
+            except (discord.RateLimited, discord.HTTPException) as e:
+                if isinstance(e, discord.HTTPException) and e.status != 429:
+                    self._finish(job, error=e)
+                    return
+                self.rate_limited += 1
+                job.attempts += 1
+                if job.attempts > self.max_retries:
+                    self._finish(job, error=e)
+                    return
+                retry_after = _retry_after(e)
+                now = time.monotonic()
+                if route.bucket is not None:
+                    route.bucket.block(now + retry_after)
+                # Jitter keeps channels that were limited together from retrying in lockstep.
+                job.not_before = now + retry_after + random.uniform(0, 0.1 + retry_after * 0.25)
+                heapq.heappush(route.jobs, job)
+            except Exception as e:
+                self._finish(job, error=e)
+            else:
+                self._finish(job, result=result)
+        finally:
+            route.busy = False
+            self._kick()
+
+    @staticmethod
+    def _finish(job: _Job, result: Any = None, error: Optional[BaseException] = None) -> None:
+        for future in job.futures:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # Convenience wrappers for the calls the bots make.
+
+    def send(
+        self,
+        channel,
+        *args,
+        priority: int = INTERACTIVE,
+        coalesce_key: Optional[Hashable] = None,
+        file_bytes: Optional[Tuple[str, bytes]] = None,
+        **kwargs,
+    ):
+        """channel.send; file_bytes=(filename, data) is rewrapped on each attempt so retries can re-upload it."""
+        def call():
+            if file_bytes is not None:
+                kwargs["file"] = discord.File(io.BytesIO(file_bytes[1]), filename=file_bytes[0])
+            return channel.send(*args, **kwargs)
+
+        return self.submit(("channel", channel.id), call, priority=priority, coalesce_key=coalesce_key)
+
+    def edit(self, message, *, priority: int = INTERACTIVE, coalesce_key: Optional[Hashable] = None, **kwargs):
+        return self.submit(
+            ("channel", message.channel.id), lambda: message.edit(**kwargs), priority=priority, coalesce_key=coalesce_key
+        )
+
+    def _initial_response(self, interaction: discord.Interaction, make_call: Callable[[], Awaitable[Any]]):
+        async def call():
+            result = await make_call()
+            if self.on_response is not None:
+                self.on_response(interaction)
+            return result
+
+        return self.submit(("interaction", interaction.id), call, limited=False)
+
+    def respond(self, interaction: discord.Interaction, *args, file_path: Optional[str] = None, **kwargs):
+        """interaction.response.send_message; file_path is reopened on each attempt so retries can re-upload it."""
+        def call():
+            if file_path is not None:
+                kwargs["file"] = discord.File(file_path)
+            return interaction.response.send_message(*args, **kwargs)
+
+        return self._initial_response(interaction, call)
+
+    def defer(self, interaction: discord.Interaction, **kwargs):
+        return self._initial_response(interaction, lambda: interaction.response.defer(**kwargs))
+
+    def edit_response(self, interaction: discord.Interaction, **kwargs):
+        return self._initial_response(interaction, lambda: interaction.response.edit_message(**kwargs))
+
+    def edit_original(self, interaction: discord.Interaction, **kwargs):
+        return self.submit(
+            ("interaction", interaction.id), lambda: interaction.edit_original_response(**kwargs), limited=False
+        )
+
+    def followup(self, interaction: discord.Interaction, *args, file_path: Optional[str] = None, **kwargs):
+        """interaction.followup.send; file_path works as in respond."""
+        def call():
+            if file_path is not None:
+                kwargs["file"] = discord.File(file_path)
+            return interaction.followup.send(*args, **kwargs)
+
+        return self.submit(("interaction", interaction.id), call, limited=False)
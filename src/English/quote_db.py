@@ -0,0 +1,280 @@
+# Optional SQLite (WAL) backend for quotes; same interface as QuoteStore, indexed by author and time.
+#
+# One-shot import of the existing CSV (the bot switches to the database once the file exists):
+#   python quote_db.py quotes.csv quotes.sqlite3
+import csv
+import os
+import random
+import sqlite3
+import sys
+import threading
+from typing import Iterable, List, Optional, Sequence
+
+from quote_search import tokenize
+from quote_store import Quote
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    author_name TEXT NOT NULL,
+    author_id INTEGER,
+    created_at REAL,
+    message_id TEXT,
+    author_seq INTEGER
+);
+"""
+
+# author_seq numbers an author's quotes 1, 2, 3... (by author_id, or by name for rows without one),
+# so a random per-author pick is one seek on these indexes.
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS quotes_author_seq ON quotes (author_id, author_seq);
+CREATE INDEX IF NOT EXISTS quotes_name_seq ON quotes (author_name, author_id, author_seq);
+CREATE INDEX IF NOT EXISTS quotes_created_at ON quotes (created_at);
+CREATE INDEX IF NOT EXISTS quotes_message_id ON quotes (message_id);
+"""
+
+# Numbers the rows of databases created before author_seq existed.
+_BACKFILL_SEQ = """
+UPDATE quotes SET author_seq = numbered.seq FROM (
+    SELECT id, row_number() OVER (
+        PARTITION BY author_id, CASE WHEN author_id IS NULL THEN author_name END ORDER BY id
+    ) AS seq FROM quotes
+) AS numbered WHERE quotes.id = numbered.id;
+"""
+
+# Full-text index over quote text; the trigger keeps it in step with every insert.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE quotes_fts USING fts5 (
+    text, content='quotes', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER quotes_fts_insert AFTER INSERT ON quotes BEGIN
+    INSERT INTO quotes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER quotes_fts_delete AFTER DELETE ON quotes BEGIN
+    INSERT INTO quotes_fts (quotes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+INSERT INTO quotes_fts (quotes_fts) VALUES ('rebuild');
+"""
+
+
+def _as_text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _bm25(terms: List[str], docs: List[List[str]], k1: float = 1.2, b: float = 0.75) -> List[float]:
+    # BM25 over the window alone: every doc contains every term, so idf is flat and only term
+    # frequency and length matter. Exact words count fully and longer words at 0.8, as in quote_search.
+    if not docs:
+        return []
+    avg_length = sum(map(len, docs)) / len(docs) or 1.0
+    scores = []
+    for tokens in docs:
+        norm = k1 * (1 - b + b * len(tokens) / avg_length)
+        score = 0.0
+        for term in terms:
+            if len(term) > 1:
+                tf = sum(1.0 if token == term else 0.8 for token in tokens if token.startswith(term))
+            else:
+                tf = tokens.count(term)
+            score += tf * (k1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+
+class SqliteQuoteStore:
+    """Quotes in SQLite. Every method blocks, so call it through asyncio.to_thread, and prepare() first.
+
+    Quotes are only ever appended, so ids have no gaps: an unfiltered pick draws an id between the
+    smallest and largest and seeks to it. Per-author picks draw a position in the author's
+    author_seq numbering and seek to that, so every pick is a few index lookups and uniform.
+    """
+
+    def __init__(self, path: str, search_window: int = 256):
+        self.path = path
+        self.search_window = search_window
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL keeps the fsync-per-commit durability the CSV journal has.
+        self._conn.execute("PRAGMA synchronous=FULL")
+
+    def prepare(self) -> None:
+        """Create the schema and bring older databases up to date; call once before the first query.
+
+        On a database from before author_seq or search existed this backfills the column and builds
+        the full-text index, which reads every row, so the bot runs it from setup_hook in a thread.
+        """
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(quotes)")}
+            if "author_seq" not in columns:
+                self._conn.executescript(
+                    f"BEGIN; ALTER TABLE quotes ADD COLUMN author_seq INTEGER; {_BACKFILL_SEQ} COMMIT;"
+                )
+            self._conn.executescript(_INDEXES)
+            has_fts = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'quotes_fts'").fetchone()
+            if not has_fts:
+                self._conn.executescript(f"BEGIN; {_FTS_SCHEMA} COMMIT;")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM quotes").fetchone()[0]
+
+    def refresh(self, force: bool = False) -> None:
+        # Nothing to do: every query reads the database directly.
+        pass
+
+    def append(self, quote_text: str, author_name: str, unix_ts, snowflake, author_id: Optional[int] = None) -> None:
+        self.append_many([(quote_text, author_name, unix_ts, snowflake, author_id)])
+
+    def append_many(self, rows: Iterable[Sequence]) -> int:
+        """Insert rows in one transaction; rows are (text, author_name, unix_ts, snowflake[, author_id]).
+
+        Returns how many were inserted (rows without text are skipped, as in the CSV store).
+        """
+        values = []
+        for row in rows:
+            quote_text, author_name, unix_ts, snowflake = (_as_text(v).strip() for v in row[:4])
+            if not quote_text:
+                continue
+            author_id = row[4] if len(row) > 4 else None
+            values.append([quote_text, author_name, author_id, unix_ts, snowflake, None])
+        if not values:
+            return 0
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                # Continue each author's numbering from the database, then count up within the batch.
+                next_seq = {}
+                for value in values:
+                    author_name, author_id = value[1], value[2]
+                    key = (author_id, None if author_id is not None else author_name)
+                    seq = next_seq.get(key)
+                    if seq is None:
+                        seq = self._author_count(author_id, author_name) + 1
+                    value[5] = seq
+                    next_seq[key] = seq + 1
+                self._conn.executemany(
+                    "INSERT INTO quotes (text, author_name, author_id, created_at, message_id, author_seq) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+        return len(values)
+
+    def _author_count(self, author_id: Optional[int], author_name: str) -> int:
+        # Quotes stored under this author id, or under this name without an id; max() of an index suffix is one seek.
+        if author_id is not None:
+            row = self._conn.execute("SELECT max(author_seq) FROM quotes WHERE author_id = ?", (author_id,)).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT max(author_seq) FROM quotes WHERE author_name = ? AND author_id IS NULL", (author_name,)
+            ).fetchone()
+        return row[0] or 0
+
+    def _row_at(self, where: str, params: tuple, offset: int = 0) -> Optional[Quote]:
+        row = self._conn.execute(
+            f"SELECT text, author_name, created_at, message_id FROM quotes WHERE {where} ORDER BY id LIMIT 1 OFFSET ?",
+            params + (offset,),
+        ).fetchone()
+        return None if row is None else tuple(_as_text(v) for v in row)
+
+    def random_quote(self, author_name: Optional[str] = None, author_id: Optional[int] = None) -> Optional[Quote]:
+        """Return a random quote, optionally limited to one author by id or display name.
+
+        With both, rows saved before ids were recorded (author_id NULL) still count by name.
+        """
+        with self._lock:
+            if author_id is None and author_name is None:
+                # Separate subqueries so each bound is one seek (SQLite only does that for a lone min/max).
+                low, high = self._conn.execute(
+                    "SELECT (SELECT min(id) FROM quotes), (SELECT max(id) FROM quotes)"
+                ).fetchone()
+                if low is None:
+                    return None
+                return self._row_at("id >= ?", (random.randint(low, high),))
+            if author_id is None:
+                # By name alone this spans every id the name was stored under; authors are small, so
+                # walking this author's slice of the name index is cheap.
+                count = self._conn.execute(
+                    "SELECT count(*) FROM quotes WHERE author_name = ?", (author_name,)
+                ).fetchone()[0]
+                if not count:
+                    return None
+                return self._row_at("author_name = ?", (author_name,), random.randrange(count))
+            by_id = self._author_count(author_id, "")
+            by_name = self._author_count(None, author_name) if author_name is not None else 0
+            if not by_id + by_name:
+                return None
+            pick = random.randrange(by_id + by_name) + 1
+            if pick <= by_id:
+                return self._row_at("author_id = ? AND author_seq = ?", (author_id, pick))
+            return self._row_at(
+                "author_name = ? AND author_id IS NULL AND author_seq = ?", (author_name, pick - by_id)
+            )
+
+    def search(self, query: str, limit: int = 5, author_name: Optional[str] = None) -> List[Quote]:
+        """Quotes containing every word of `query` (the words may be prefixes), best match first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        # Quote each term so FTS5 operators typed by users are taken literally; * makes it a prefix
+        # (not for one-letter terms, which would match a large slice of the vocabulary).
+        match = " ".join(
+            '"{}"{}'.format(term.replace('"', '""'), "*" if len(term) > 1 else "") for term in terms
+        )
+        author_filter, params = "", (match,)
+        if author_name is not None:
+            author_filter, params = " AND q.author_name = ?", (match, author_name)
+        with self._lock:
+            # FTS5 walks its matches newest first and stops at the window, so common words stay cheap.
+            # FTS5's own rank would score every row it visits; the window is ranked here instead.
+            rows = self._conn.execute(
+                "SELECT q.text, q.author_name, q.created_at, q.message_id FROM quotes_fts f "
+                f"JOIN quotes q ON q.id = f.rowid WHERE quotes_fts MATCH ?{author_filter} "
+                "ORDER BY f.rowid DESC LIMIT ?",
+                params + (self.search_window,),
+            ).fetchall()
+        scored = sorted(zip(_bm25(terms, [tokenize(row[0]) for row in rows]), range(len(rows))), reverse=True)
+        return [tuple(_as_text(v) for v in rows[i]) for _, i in scored[:limit]]
+
+    def by_snowflake(self, snowflake) -> Optional[Quote]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, author_name, created_at, message_id FROM quotes WHERE message_id = ? LIMIT 1",
+                (str(snowflake),),
+            ).fetchone()
+        return None if row is None else tuple(_as_text(v) for v in row)
+
+    def import_csv(self, csv_path: str, batch_size: int = 5000) -> int:
+        """Copy every row of a quotes CSV into an empty database; returns the number of rows imported."""
+        if len(self):
+            raise RuntimeError(f"{self.path} already has quotes; refusing to import twice.")
+        imported = 0
+        batch = []
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for r in csv.reader(f):
+                if len(r) < 4:
+                    continue
+                batch.append(r[:4])
+                if len(batch) >= batch_size:
+                    imported += self.append_many(batch)
+                    batch = []
+        return imported + self.append_many(batch)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python quote_db.py <quotes.csv> <quotes.sqlite3>")
+        sys.exit(2)
+    if not os.path.exists(sys.argv[1]):
+        print(f"{sys.argv[1]} not found.")
+        sys.exit(1)
+    store = SqliteQuoteStore(sys.argv[2])
+    store.prepare()
+    print(f"Imported {store.import_csv(sys.argv[1])} quotes into {sys.argv[2]}.")
+    store.close()
@@ -0,0 +1,98 @@
+# Write-behind journal for quote appends: one writer task, batched writes, one fsync per batch.
+import asyncio
+import sqlite3
+from typing import List, Optional, Tuple, Union
+
+from quote_db import SqliteQuoteStore
+from quote_store import QuoteStore
+
+_Entry = Tuple[Tuple[str, str, object, object, Optional[int]], asyncio.Future]
+
+
+def _report_failure(future: asyncio.Future) -> None:
+    # Retrieving the exception here also keeps asyncio from warning about unawaited failures.
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Failed to save quote: {future.exception()}")
+
+
+class QuoteJournal:
+    """Queue of quote rows flushed to a QuoteStore or SqliteQuoteStore by a single background task.
+
+    `submit` returns immediately, so interactions are answered without waiting on the disk. Only
+    the writer task touches the file, so rows from concurrent commands never interleave. Rows
+    queued while a batch is being written go out together in the next batch: one write and one
+    fsync however many arrived. A failed batch is retried a few times before its rows are
+    reported as lost. `drain()` flushes everything still queued and stops the task.
+    """
+
+    def __init__(
+        self,
+        store: Union[QuoteStore, SqliteQuoteStore],
+        max_batch: int = 256,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        self.store = store
+        self.max_batch = max_batch
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def submit(
+        self, quote_text: str, author_name: str, unix_ts, snowflake, author_id: Optional[int] = None
+    ) -> asyncio.Future:
+        """Queue one row; the returned future resolves once it is on disk."""
+        if self._closed:
+            raise RuntimeError("Quote journal is shut down.")
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        future.add_done_callback(_report_failure)
+        self._queue.put_nowait(((quote_text, author_name, unix_ts, snowflake, author_id), future))
+        return future
+
+    async def _write(self, rows) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                await asyncio.to_thread(self.store.append_many, rows)
+                return
+            except (OSError, sqlite3.OperationalError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.retry_delay)
+
+    async def _run(self) -> None:
+        while True:
+            batch: List[_Entry] = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._write([row for row, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self) -> None:
+        """Stop accepting rows, wait until every queued row is written, then stop the writer."""
+        self._closed = True
+        if self._queue is not None and self._task is not None and not self._task.done():
+            await self._queue.join()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
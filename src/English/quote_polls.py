@@ -0,0 +1,256 @@
+# Quote polls that survive restarts: one persistent view serves every poll, and votes are stored per user.
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+import discord
+
+from outbound import OutboundScheduler
+from quote_journal import QuoteJournal
+
+# Polls nobody finished are dropped after this long.
+_MAX_POLL_AGE = 30 * 24 * 3600
+
+
+class PollState:
+    __slots__ = (
+        "message_id", "quote_text", "author_name", "author_id", "needed", "yes", "no", "completed", "created_at"
+    )
+
+    def __init__(self, message_id: int, quote_text: str, author_name: str, author_id: Optional[int], needed: int):
+        self.message_id = message_id
+        self.quote_text = quote_text
+        self.author_name = author_name
+        self.author_id = author_id
+        self.needed = needed
+        self.yes: Set[int] = set()
+        self.no: Set[int] = set()
+        self.completed = False
+        self.created_at = time.time()
+
+    def to_json(self) -> Dict:
+        return {
+            "quote_text": self.quote_text,
+            "author_name": self.author_name,
+            "author_id": self.author_id,
+            "needed": self.needed,
+            "yes": sorted(self.yes),
+            "no": sorted(self.no),
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_json(cls, message_id: int, data: Dict) -> "PollState":
+        state = cls(message_id, data["quote_text"], data["author_name"], data.get("author_id"), data["needed"])
+        state.yes = set(data.get("yes", ()))
+        state.no = set(data.get("no", ()))
+        state.created_at = data.get("created_at", state.created_at)
+        return state
+
+
+def poll_text(quote_text: str, author_name: str, needed: int) -> str:
+    return f'Did the quote actually happen irl?\n"{quote_text}" \\- {author_name}\nNeeds {needed} 👍 votes to confirm'
+
+
+def poll_embed(state: PollState, extra: Optional[str] = None) -> discord.Embed:
+    description = f"{poll_text(state.quote_text, state.author_name, state.needed)}\n\n"
+    description += f"👍 Yes: {len(state.yes)}\n👎 No: {len(state.no)}"
+    if extra:
+        description += f"\n\n{extra}"
+    return discord.Embed(description=description, color=discord.Color.blurple())
+
+
+class QuotePollView(discord.ui.View):
+    """The buttons of every quote poll. Custom ids are fixed, so one registered instance answers
+    clicks on any poll message, including ones sent before a restart."""
+
+    def __init__(self, polls: "QuotePolls", disabled: bool = False):
+        super().__init__(timeout=None)
+        self.polls = polls
+        for child in self.children:
+            child.disabled = disabled
+
+    @discord.ui.button(label="👍 Yes", style=discord.ButtonStyle.green, custom_id="quote_poll:yes")
+    async def yes_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.polls.vote(interaction, True)
+
+    @discord.ui.button(label="👎 No", style=discord.ButtonStyle.red, custom_id="quote_poll:no")
+    async def no_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.polls.vote(interaction, False)
+
+
+class QuotePolls:
+    """Open polls keyed by message id, stored as JSON next to the other caches.
+
+    Each user has at most one vote per poll; clicking the other button moves it. Clicks are
+    acknowledged straight away with a deferred update. The embed is rebuilt and the message
+    edited once per `edit_delay` window, however many clicks arrived in it. Saves are written
+    behind in the same way. A poll is removed from the store once it completes.
+    """
+
+    def __init__(
+        self,
+        outbound: OutboundScheduler,
+        journal: QuoteJournal,
+        path: str,
+        edit_delay: float = 0.75,
+        save_delay: float = 1.0,
+    ):
+        self.outbound = outbound
+        self.journal = journal
+        self.path = path
+        self.edit_delay = edit_delay
+        self.save_delay = save_delay
+        self._polls: Dict[int, PollState] = {}
+        # message id -> newest click not yet reflected in the message; its token is used for the edit.
+        self._pending_edits: Dict[int, discord.Interaction] = {}
+        self._edit_tasks: Dict[int, asyncio.Task] = {}
+        self._save_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._polls)
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        cutoff = time.time() - _MAX_POLL_AGE
+        for key, value in data.items():
+            state = PollState.from_json(int(key), value)
+            if state.created_at >= cutoff:
+                self._polls[state.message_id] = state
+
+    def view(self) -> QuotePollView:
+        return QuotePollView(self)
+
+    def attach(self, bot: discord.Client) -> None:
+        """Load stored polls and route clicks on their buttons back here; call from setup_hook."""
+        self.load()
+        bot.add_view(self.view())
+
+    def _snapshot(self) -> Dict:
+        return {str(mid): state.to_json() for mid, state in self._polls.items()}
+
+    def _write(self, data: Dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _schedule_save(self) -> None:
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.get_running_loop().create_task(self._save_later())
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(self.save_delay)
+        try:
+            # Snapshot on the loop; the thread only serialises and writes it.
+            await asyncio.to_thread(self._write, self._snapshot())
+        except OSError as e:
+            print(f"Failed to save quote polls: {e}")
+
+    async def start(
+        self, interaction: discord.Interaction, quote_text: str, author: discord.abc.User, author_name: str, needed: int
+    ) -> None:
+        """Post a new poll as the reply to `interaction` and start tracking it."""
+        state = PollState(0, quote_text, author_name, author.id, needed)
+        response = await self.outbound.respond(interaction, embed=poll_embed(state), view=self.view())
+        # discord.py 2.5+ hands back the created message; older versions need a fetch.
+        message = getattr(response, "resource", None)
+        if not isinstance(message, (discord.Message, discord.InteractionMessage)):
+            message = await interaction.original_response()
+        state.message_id = message.id
+        self._polls[state.message_id] = state
+        self._schedule_save()
+
+    async def vote(self, interaction: discord.Interaction, yes: bool) -> None:
+        message = interaction.message
+        state = self._polls.get(message.id) if message else None
+        if state is None or state.completed:
+            await self.outbound.respond(interaction, "This poll is closed.", ephemeral=True)
+            return
+
+        user_id = interaction.user.id
+        mine, other = (state.yes, state.no) if yes else (state.no, state.yes)
+        changed = user_id not in mine
+        mine.add(user_id)
+        other.discard(user_id)
+        # Decided before the first await, so two yes clicks landing together cannot both complete the poll.
+        completed = changed and len(state.yes) >= state.needed and self._complete(state)
+        await self.outbound.defer(interaction)
+        if completed:
+            try:
+                await self.outbound.edit_original(
+                    interaction,
+                    embed=poll_embed(state, "Quote added successfully, 👍 threshold reached"),
+                    view=QuotePollView(self, disabled=True),
+                )
+            except discord.HTTPException:
+                pass
+            return
+        if not changed:
+            return
+
+        self._schedule_save()
+        self._pending_edits[state.message_id] = interaction
+        task = self._edit_tasks.get(state.message_id)
+        if task is None or task.done():
+            self._edit_tasks[state.message_id] = asyncio.get_running_loop().create_task(
+                self._edit_later(state.message_id)
+            )
+
+    async def _edit_later(self, message_id: int) -> None:
+        # Clicks that land while an edit is in flight are picked up by the next pass.
+        while True:
+            await asyncio.sleep(self.edit_delay)
+            interaction = self._pending_edits.pop(message_id, None)
+            state = self._polls.get(message_id)
+            if interaction is None or state is None:
+                self._edit_tasks.pop(message_id, None)
+                return
+            try:
+                await self.outbound.edit_original(interaction, embed=poll_embed(state), view=self.view())
+            except discord.HTTPException:
+                pass
+
+    def _complete(self, state: PollState) -> bool:
+        """Close the poll and journal its quote; False if it was already completed."""
+        if state.completed:
+            return False
+        state.completed = True
+        self._pending_edits.pop(state.message_id, None)
+        task = self._edit_tasks.pop(state.message_id, None)
+        if task is not None:
+            task.cancel()
+        self.journal.submit(
+            state.quote_text,
+            state.author_name,
+            datetime.now(tz=timezone.utc).timestamp(),
+            state.message_id,
+            state.author_id,
+        )
+        self._polls.pop(state.message_id, None)
+        self._schedule_save()
+        return True
+
+    async def close(self) -> None:
+        """Push out pending edits and write the store; call before disconnecting."""
+        for message_id, task in list(self._edit_tasks.items()):
+            if not task.done():
+                task.cancel()
+                interaction = self._pending_edits.pop(message_id, None)
+                state = self._polls.get(message_id)
+                if interaction is not None and state is not None:
+                    try:
+                        await self.outbound.edit_original(interaction, embed=poll_embed(state), view=self.view())
+                    except discord.HTTPException:
+                        pass
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        await asyncio.to_thread(self._write, self._snapshot())
@@ -0,0 +1,247 @@
+# In-memory inverted index for /quote search: word tokens, prefix matching and BM25 ranking.
+import bisect
+import heapq
+import math
+import re
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(r"\w+")
+# A window's candidates are checked against a term by binary search once the term's rows there
+# outnumber them this many times; below that, building a set of those rows and intersecting is cheaper.
+_PROBE_RATIO = 16
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def _gallop_left(rows: array, target: int, hi: int) -> int:
+    """First index below `hi` whose row is >= target, stepping back from `hi` in doubling strides."""
+    step = 1
+    lo = hi - 1
+    while lo > 0 and rows[lo] >= target:
+        hi = lo
+        step <<= 1
+        lo = hi - step
+    return bisect.bisect_left(rows, target, max(lo, 0), hi)
+
+
+def _first_words(spans: List[Tuple[int, array, int, int]]) -> Dict[int, int]:
+    """Row -> index of the first word whose (index, postings, start, end) slice holds it."""
+    owner: Dict[int, int] = {}
+    # Later updates win, so the words go in reverse to leave each row with its first one.
+    for i, rows, start, end in reversed(spans):
+        owner.update(dict.fromkeys(rows[start:end], i))
+    return owner
+
+
+class InvertedIndex:
+    """Word -> rows postings over documents that are only ever appended.
+
+    Row ids must be added in increasing order, which keeps every postings array sorted. A query
+    term matches every indexed word it is a prefix of (one-letter terms only match exactly); all
+    terms must match. The postings are intersected from the newest end, one window of row ids at a
+    time: each array gallops back to the window's start, and the slices are intersected as sets,
+    or by binary search when one term is far more common than the candidates left. Windows are
+    sized from the share of rows that matched so far. Only the newest `max_candidates` rows
+    matching every term are ranked, so a query for common words stays cheap, and the walk stops
+    early once no older row could score its way into the top `limit`.
+    """
+
+    def __init__(self, max_prefix_terms: int = 16, max_candidates: int = 256, k1: float = 1.2, b: float = 0.75):
+        self.max_prefix_terms = max_prefix_terms
+        self.max_candidates = max_candidates
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, array] = {}
+        # Term frequencies above one, by word and row; almost every posting has a frequency of one,
+        # so most words have no entry here at all.
+        self._repeats: Dict[str, Dict[int, int]] = {}
+        # Kept sorted so prefix expansion is a bisect plus a short walk. New words wait in
+        # _new_words and are merged in on the next expansion, not sorted in one by one.
+        self._vocab: List[str] = []
+        self._new_words: List[str] = []
+        self._max_tf: Dict[str, int] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._min_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, row: int, text: str) -> None:
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            rows = self._postings.get(token)
+            if rows is None:
+                rows = self._postings[token] = array("I")
+                self._new_words.append(token)
+            rows.append(row)
+            if count > 1:
+                self._repeats.setdefault(token, {})[row] = count
+            if count > self._max_tf.get(token, 0):
+                self._max_tf[token] = count
+        if not self._lengths or len(tokens) < self._min_length:
+            self._min_length = len(tokens)
+        self._lengths[row] = len(tokens)
+        self._total_length += len(tokens)
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        # The exact word (if indexed) at full weight, then up to max_prefix_terms longer words at a discount.
+        matches: List[Tuple[str, float]] = []
+        if term in self._postings:
+            matches.append((term, 1.0))
+        if len(term) < 2:
+            return matches  # a one-letter prefix would pull in a large slice of the vocabulary
+        if self._new_words:
+            # Timsort merges the sorted vocabulary and the new run in about linear time.
+            self._vocab.extend(self._new_words)
+            self._vocab.sort()
+            self._new_words = []
+        start = bisect.bisect_right(self._vocab, term)
+        for word in self._vocab[start:start + self.max_prefix_terms]:
+            if not word.startswith(term):
+                break
+            matches.append((word, 0.8))
+        return matches
+
+    @staticmethod
+    def _window(
+        postings: List[List[array]], ends: List[List[int]], lo: int, accept: Optional[Callable[[int], bool]]
+    ) -> Tuple[Iterable[int], List[Optional[Dict[int, int]]]]:
+        """Accepted rows >= lo matching every term, newest first, below where the previous window started.
+
+        `ends` holds each postings array's cursor and is moved down to lo. For terms with several
+        words, the second value maps each matched row to the first (best) word it contains.
+        """
+        if len(postings) == 1 and len(postings[0]) == 1:
+            # A single word: its postings already are the answer, in order.
+            rows, end = postings[0][0], ends[0][0]
+            start = ends[0][0] = _gallop_left(rows, lo, end)
+            newest_first = reversed(rows[start:end])
+            return (newest_first if accept is None else filter(accept, newest_first)), [None]
+
+        owners: List[Optional[Dict[int, int]]] = []
+        matched: Optional[Set[int]] = None
+        for lists, term_ends in zip(postings, ends):
+            spans = []
+            for i, rows in enumerate(lists):
+                end = term_ends[i]
+                start = term_ends[i] = _gallop_left(rows, lo, end)
+                if start < end:
+                    spans.append((i, rows, start, end))
+            # Every term's cursors move to lo, even once nothing is left to match in this window.
+            # With a single word, rows[start:end] is that word's slice of the window.
+            owner: Optional[Dict[int, int]] = None
+            if matched is None:
+                # The rarest term; the filter goes first so the other terms only see accepted rows.
+                here = rows[start:end] if len(lists) == 1 else _first_words(spans)
+                owner = None if len(lists) == 1 else here
+                matched = set(here if accept is None else filter(accept, here))
+            elif matched and sum(e - s for _, _, s, e in spans) <= _PROBE_RATIO * len(matched) * len(spans):
+                if len(lists) == 1:
+                    matched.intersection_update(rows[start:end])
+                else:
+                    owner = _first_words(spans)
+                    matched &= owner.keys()
+            elif matched:
+                # Few candidates against many rows: binary-search each candidate instead.
+                bisect_left = bisect.bisect_left
+                if len(lists) == 1:
+                    matched = {
+                        row for row in matched if (pos := bisect_left(rows, row, start, end)) < end and rows[pos] == row
+                    }
+                else:
+                    owner = {}
+                    for row in matched:
+                        for i, rows, start, end in spans:
+                            pos = bisect_left(rows, row, start, end)
+                            if pos < end and rows[pos] == row:
+                                owner[row] = i
+                                break
+                    matched = set(owner)
+            owners.append(owner)
+        return sorted(matched or (), reverse=True), owners
+
+    def search(self, query: str, limit: int = 5, accept: Optional[Callable[[int], bool]] = None) -> List[int]:
+        """Best matching rows for `query`, highest score first; `accept` can filter rows (by author, say)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._lengths or limit <= 0:
+            return []
+        expanded = [self._expand(term) for term in terms]
+        if any(not words for words in expanded):
+            return []
+
+        n_docs = len(self._lengths)
+        avg_length = self._total_length / n_docs
+        expanded.sort(key=lambda words: sum(len(self._postings[w]) for w, _ in words))
+        idf = {
+            word: math.log(1 + (n_docs - len(self._postings[word]) + 0.5) / (len(self._postings[word]) + 0.5))
+            for words in expanded
+            for word, _ in words
+        }
+        lengths, k1, b = self._lengths, self.k1, self.b
+        # Per term and word: (repeats, weight * idf * (k1 + 1)), exact word first.
+        scoring = [
+            [(self._repeats.get(w, {}), weight * idf[w] * (k1 + 1)) for w, weight in words] for words in expanded
+        ]
+        # A row's score is at most every term at its best word and highest frequency; with the
+        # shortest row length that bounds any row at all.
+        caps = [
+            (max(coef for _, coef in words_scoring), max(self._max_tf[w] for w, _ in words))
+            for words_scoring, words in zip(scoring, expanded)
+        ]
+
+        def norm_and_cap(length: int) -> Tuple[float, float]:
+            norm = k1 * (1 - b + b * length / avg_length)
+            return norm, sum(coef * tf / (tf + norm) for coef, tf in caps)
+
+        ceiling = norm_and_cap(self._min_length)[1]
+        by_length: Dict[int, Tuple[float, float]] = {}
+        postings = [[self._postings[w] for w, _ in words] for words in expanded]
+        ends = [[len(rows) for rows in lists] for lists in postings]
+        newest = hi = max(rows[-1] for rows in postings[0]) + 1
+        # The first window is sized to hold max_candidates matches if the terms were independent;
+        # later ones from the share of rows that matched so far, doubling while nothing has.
+        density = 1.0
+        for lists in postings:
+            density *= min(1.0, sum(map(len, lists)) / n_docs)
+        span = max(64, int(self.max_candidates / max(density, 1 / n_docs)))
+
+        best: List[Tuple[float, int]] = []  # min-heap of the top `limit`
+        ranked = 0
+        while hi > 0 and ranked < self.max_candidates:
+            lo = max(0, hi - span)
+            rows, owners = self._window(postings, ends, lo, accept)
+            terms_scoring = list(zip(scoring, owners))
+            for row in rows:
+                if ranked == self.max_candidates:
+                    break
+                ranked += 1
+                length = lengths[row]
+                norm, cap = by_length.get(length) or by_length.setdefault(length, norm_and_cap(length))
+                if len(best) == limit and cap <= best[0][0]:
+                    continue  # cannot beat the current top even with its best frequencies
+                score = 0.0
+                for words_scoring, owner in terms_scoring:
+                    repeats, coef = words_scoring[0 if owner is None else owner[row]]
+                    tf = repeats.get(row, 1)
+                    score += coef * tf / (tf + norm)
+                if len(best) < limit:
+                    heapq.heappush(best, (score, row))
+                else:
+                    heapq.heappushpop(best, (score, row))
+            if len(best) == limit and best[0][0] >= ceiling:
+                break  # older rows can only tie, and ties go to the newer row
+            hi = lo
+            if ranked:
+                span = max(64, int((self.max_candidates - ranked) * (newest - hi) / ranked * 1.25))
+            else:
+                span *= 2
+        return [row for _, row in sorted(best, reverse=True)]
@@ -0,0 +1,241 @@
+# Shared quote storage for both bots: parse each quote file once, then only read rows appended since.
+import csv
+import io
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from quote_search import InvertedIndex
+
+# (quote_text, author_name, unix_ts_str, snowflake) exactly as stored in the CSV.
+Quote = Tuple[str, str, str, str]
+
+
+class _AppendOnlyFile(ABC):
+    """Parsed view of an append-only text file that only ever reads bytes it has not seen.
+
+    The file is stat'ed at most once per `check_interval` seconds. Growth is parsed from the last
+    consumed offset; a truncated or replaced file is parsed again from the start. Subclasses
+    provide `_clear` and `_parse`. Callers on the event loop should go through a thread, since the
+    first load or a reload after replacement reads the whole file.
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # File position already parsed plus the stat fingerprint seen at that point.
+        self._offset = 0
+        self._stat_key: Optional[Tuple[int, int, int]] = None
+        # Stat fingerprint of the last read that left an unterminated final record unparsed.
+        self._tail_key: Optional[Tuple[int, int, int]] = None
+        self._checked_at = float("-inf")
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Drop everything parsed so far."""
+
+    @abstractmethod
+    def _parse(self, text: str) -> None:
+        """Add the records in `text`, which holds whole lines only (except a final settled one)."""
+
+    def _reset(self) -> None:
+        self._clear()
+        self._offset = 0
+        self._stat_key = None
+        self._tail_key = None
+
+    def refresh(self, force: bool = False) -> None:
+        """Pick up external changes: appended bytes are parsed incrementally, anything else reloads fully."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return
+            stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if stat_key == self._stat_key:
+                return
+            if st.st_size < self._offset or (self._stat_key is not None and st.st_ino != self._stat_key[0]):
+                # Replaced or truncated, so the parsed prefix can no longer be trusted.
+                self._reset()
+
+            full_load = self._offset == 0
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                tail = f.read()
+            # Only consume whole records; a writer may still be halfway through the last line. A final
+            # line without a newline is taken on a full load, or once the file stopped changing.
+            end = tail.rfind(b"\n") + 1
+            if end < len(tail) and (full_load or stat_key == self._tail_key):
+                end = len(tail)
+            self._tail_key = stat_key
+            if end:
+                self._parse(tail[:end].decode("utf-8"))
+                self._offset += end
+            if end == len(tail):
+                self._stat_key = stat_key
+
+
+class QuoteStore(_AppendOnlyFile):
+    """In-memory column store over an append-only quotes CSV."""
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        super().__init__(path, check_interval)
+        self._clear()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _clear(self) -> None:
+        # Columns are parallel lists; authors are interned ids so repeated names cost one int each.
+        self._texts: List[str] = []
+        self._author_ids = array("I")
+        self._timestamps: List[str] = []
+        self._snowflakes: List[str] = []
+        self._author_names: List[str] = []
+        self._author_lookup: Dict[str, int] = {}
+        self._rows_by_author: Dict[int, array] = {}
+        self._row_by_snowflake: Dict[str, int] = {}
+        self._search = InvertedIndex()
+
+    def _index_row(self, quote_text: str, author_name: str, unix_ts_str: str, snowflake: str) -> None:
+        if not quote_text:
+            return
+        author_id = self._author_lookup.get(author_name)
+        if author_id is None:
+            author_id = len(self._author_names)
+            self._author_names.append(author_name)
+            self._author_lookup[author_name] = author_id
+            self._rows_by_author[author_id] = array("I")
+        row = len(self._texts)
+        self._texts.append(quote_text)
+        self._author_ids.append(author_id)
+        self._timestamps.append(unix_ts_str)
+        self._snowflakes.append(snowflake)
+        self._rows_by_author[author_id].append(row)
+        if snowflake:
+            self._row_by_snowflake[snowflake] = row
+        self._search.add(row, quote_text)
+
+    def _parse(self, text: str) -> None:
+        for r in csv.reader(io.StringIO(text, newline="")):
+            if len(r) < 4:
+                continue
+            self._index_row(r[0].strip(), r[1].strip(), r[2].strip(), r[3].strip())
+
+    def append(self, quote_text: str, author_name: str, unix_ts, snowflake) -> None:
+        """Write one row to the CSV and index it without rereading the file."""
+        self.append_many([(quote_text, author_name, unix_ts, snowflake)])
+
+    def append_many(self, rows) -> None:
+        """Write rows with a single write and fsync, then index them without rereading the file."""
+        buf = io.StringIO(newline="")
+        writer = csv.writer(buf)
+        for row in rows:
+            # A fifth column (author id) is only kept by the SQLite backend; the CSV layout stays as is.
+            writer.writerow(row[:4])
+        data = buf.getvalue()
+        if not data:
+            return
+        with self._lock:
+            if self._ends_unterminated():
+                data = "\r\n" + data  # keep the first new row off a final line that has no newline
+            with open(self.path, "a", encoding="utf-8", newline="") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # Only trust the new position if nothing else touched the file since the last refresh.
+            st = os.stat(self.path)
+            expected_size = self._offset + len(data.encode("utf-8"))
+            if self._stat_key is not None and self._stat_key[1] == self._offset and st.st_size == expected_size:
+                for row in rows:
+                    self._index_row(*(str(v).strip() for v in row[:4]))
+                self._offset = st.st_size
+                self._stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            else:
+                self._checked_at = float("-inf")  # let the next read pick the rows up from disk
+
+    def _ends_unterminated(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:  # missing or empty
+            return False
+
+    def _row(self, row: int) -> Quote:
+        return (
+            self._texts[row],
+            self._author_names[self._author_ids[row]],
+            self._timestamps[row],
+            self._snowflakes[row],
+        )
+
+    def random_quote(self, author_name: Optional[str] = None, author_id: Optional[int] = None) -> Optional[Quote]:
+        """Return a uniformly random quote, optionally limited to one display name (the CSV has no author ids)."""
+        self.refresh()
+        with self._lock:
+            if author_name is None:
+                if not self._texts:
+                    return None
+                return self._row(random.randrange(len(self._texts)))
+            author_id = self._author_lookup.get(author_name)
+            if author_id is None:
+                return None
+            rows = self._rows_by_author[author_id]
+            return self._row(rows[random.randrange(len(rows))])
+
+    def search(self, query: str, limit: int = 5, author_name: Optional[str] = None) -> List[Quote]:
+        """Quotes containing every word of `query` (the words may be prefixes), best match first."""
+        self.refresh()
+        with self._lock:
+            accept = None
+            if author_name is not None:
+                author_id = self._author_lookup.get(author_name)
+                if author_id is None:
+                    return []
+                author_ids = self._author_ids
+
+                def accept(row: int) -> bool:
+                    return author_ids[row] == author_id
+
+            return [self._row(row) for row in self._search.search(query, limit, accept)]
+
+    def by_snowflake(self, snowflake) -> Optional[Quote]:
+        self.refresh()
+        with self._lock:
+            row = self._row_by_snowflake.get(str(snowflake))
+            return None if row is None else self._row(row)
+
+
+class LineQuoteStore(_AppendOnlyFile):
+    """One quote per line, as in main2's quotes.txt; blank lines are skipped."""
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        super().__init__(path, check_interval)
+        self._lines: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def _clear(self) -> None:
+        self._lines = []
+
+    def _parse(self, text: str) -> None:
+        self._lines.extend(line.strip() for line in text.split("\n") if line.strip())
+
+    def random_line(self) -> Optional[str]:
+        self.refresh()
+        with self._lock:
+            if not self._lines:
+                return None
+            return self._lines[random.randrange(len(self._lines))]
@@ -0,0 +1,144 @@
+# Startup profiling: which imports a bot pays for before it can connect, and how long it takes to get ready.
+#
+#   python startup_profile.py main.py                 # import-time breakdown of the guild bot
+#   python startup_profile.py Anywhere/main2.py --top 10 --json
+#   BOT_STARTUP_PROFILE=1 python main.py              # also log time-to-ready and peak RSS once connected
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Modules worth calling out: each costs tens of MB and should only load when a command needs it.
+HEAVY_MODULES = ("cv2", "numpy")
+
+_IMPORTED_AT = time.monotonic()
+
+# Imported by the profiled process (not run as __main__), so the bot never connects.
+_IMPORT_SCRIPT = """
+import importlib, json, sys
+sys.path.insert(0, {directory!r})
+importlib.import_module({module!r})
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+"""
+
+
+def enabled() -> bool:
+    return os.environ.get("BOT_STARTUP_PROFILE", "") not in ("", "0")
+
+
+def _process_age() -> Optional[float]:
+    # Seconds since this process was created, including interpreter start-up (Linux only).
+    try:
+        with open("/proc/self/stat", "r", encoding="ascii") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def ready_report() -> str:
+    """One log line for on_ready: time since process start, peak RSS and which heavy modules are loaded."""
+    age = _process_age()
+    since = f"{age:.2f}s after process start" if age is not None else (
+        f"{time.monotonic() - _IMPORTED_AT:.2f}s after startup_profile import"
+    )
+    rss = peak_rss_mb()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    return (
+        f"Startup: ready {since}"
+        + (f", peak RSS {rss:.1f} MB" if rss is not None else "")
+        + f", heavy modules loaded: {', '.join(loaded) or 'none'}"
+    )
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    # "import time: self [us] | cumulative | imported package", nesting shown by indenting the name.
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+            rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def profile_imports(script: str, top: int = 20) -> Dict:
+    """Import `script` in a fresh interpreter with -X importtime and summarise where the time went."""
+    path = os.path.abspath(script)
+    directory, filename = os.path.split(path)
+    module = os.path.splitext(filename)[0]
+    code = _IMPORT_SCRIPT.format(directory=directory, module=module, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=directory, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {script} failed:\n{proc.stderr[-2000:]}")
+
+    rows = _parse_importtime(proc.stderr)
+    top_level = [r for r in rows if r[1] == 0]
+    by_cumulative = sorted(rows, key=lambda r: r[3], reverse=True)
+    return {
+        "script": script,
+        "wall_s": round(wall, 4),
+        "import_s": round(sum(r[3] for r in top_level) / 1e6, 4),
+        "peak_rss_mb": peak_rss_mb(children=True),
+        "heavy_loaded": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "top": [
+            {"module": name, "depth": depth, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, depth, self_us, cumulative_us in by_cumulative[:top]
+        ],
+    }
+
+
+def _print_report(report: Dict) -> None:
+    print(f"{report['script']}: imports {report['import_s'] * 1000:.0f} ms, process {report['wall_s'] * 1000:.0f} ms")
+    if report["peak_rss_mb"] is not None:
+        print(f"peak RSS after import: {report['peak_rss_mb']:.1f} MB")
+    print(f"heavy modules loaded at import: {', '.join(report['heavy_loaded']) or 'none'}")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in report["top"]:
+        indent = "  " * row["depth"]
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {indent}{row['module']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report what importing a bot module costs.")
+    parser.add_argument("script", help="bot entry point, e.g. main.py or Anywhere/main2.py")
+    parser.add_argument("--top", type=int, default=20, help="number of slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile_imports(args.script, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
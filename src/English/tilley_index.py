@@ -0,0 +1,82 @@
+# Shared Tilley image index: scan the folder once, then rescan only when its mtime changes.
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+class ImageIndex:
+    """Random image picker over a directory that may live on slow network storage.
+
+    The directory is stat'ed at most once per `check_interval` seconds. Adding, removing or
+    renaming an entry bumps the directory mtime, which triggers one scandir pass whose result is
+    diffed into the existing list, so picks stay O(1) and never touch the disk.
+    """
+
+    def __init__(self, directory: str, extensions: Tuple[str, ...] = IMAGE_EXTENSIONS, check_interval: float = 5.0):
+        self.directory = directory
+        self.extensions = extensions
+        self.check_interval = check_interval
+        self.exists = False
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._dir_mtime: Optional[int] = None
+        self._checked_at = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _add(self, name: str) -> None:
+        self._positions[name] = len(self._names)
+        self._names.append(name)
+
+    def _remove(self, name: str) -> None:
+        # Swap the last name into the hole so removal stays O(1).
+        pos = self._positions.pop(name)
+        last = self._names.pop()
+        if last != name:
+            self._names[pos] = last
+            self._positions[last] = pos
+
+    def _scan(self) -> None:
+        current = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                # DirEntry.is_file() uses the type from the directory listing, so no stat per file.
+                if entry.name.lower().endswith(self.extensions) and entry.is_file():
+                    current.add(entry.name)
+        for name in [n for n in self._names if n not in current]:
+            self._remove(name)
+        for name in current:
+            if name not in self._positions:
+                self._add(name)
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+                if mtime != self._dir_mtime:
+                    self._scan()
+                    self._dir_mtime = mtime
+            except OSError:
+                # Missing, unreadable, or a file rather than a folder (scandir raises NotADirectoryError).
+                self.exists = False
+                self._names, self._positions, self._dir_mtime = [], {}, None
+                return
+            self.exists = True
+
+    def pick(self) -> Optional[str]:
+        """Full path of a random image, or None if the folder is missing or empty."""
+        self.refresh()
+        with self._lock:
+            if not self._names:
+                return None
+            return os.path.join(self.directory, self._names[random.randrange(len(self._names))])